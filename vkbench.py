@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+import vkparse
+
+json_modes = [(format, 'none') for format in vkparse.json_formats] + [('compact', 'gzip'), ('compact', 'lzma')]
+
+def run_stages(out_dir):
+	timer = vkparse.StageTimer()
+	with redirect_stdout(io.StringIO()):
+		parsed, parse_timings, platform_time = vkparse.parse_vulkan_headers()
+	for input, elapsed in parse_timings.items():
+		timer.add(f'parse:{input}', elapsed)
+	with timer.stage('evaluate_constants'):
+		vkparse.evaluate_constants(parsed)
+	with timer.stage('parse_registry'):
+		vkparse.parse_registry()
+	json_sizes = {}
+	for format, compression in json_modes:
+		mode = format if compression == 'none' else f'{format}+{compression}'
+		with timer.stage(f'json.dump:{mode}'):
+			outfile = vkparse.dump_json(parsed, os.path.join(out_dir, 'vkcore.json'), format, compression)
+		with timer.stage(f'json.load:{mode}'):
+			vkparse.load_json(outfile)
+		json_sizes[mode] = os.path.getsize(outfile)
+	data = vkparse.load_json(os.path.join(out_dir, 'vkcore.json'))
+	with timer.stage('to_model'):
+		model = vkparse.to_model(data)
+	with timer.stage('from_model'):
+		if vkparse.from_model(model) != data:
+			raise ValueError('The typed model does not convert back to the same `vkcore.json`')
+	shard_dir = os.path.join(out_dir, 'vkcore.shards')
+	with timer.stage('json.dump:shards'):
+		vkparse.dump_json_shards(parsed, shard_dir)
+	with timer.stage('json.load:shards'):
+		shards = vkparse.load_json(shard_dir)
+		shards.lookup('vkCreateSwapchainKHR')
+		shards['VK_KHR_swapchain']
+	enum_value = 'VK_STRUCTURE_TYPE_APPLICATION_INFO'
+	expected = [(version, 'enums', enum.values[enum_value]) for version, verdata in parsed.items() if version != 'metadata' for enum in verdata['enums'].values() if enum_value in enum.values]
+	if shards.lookup(enum_value) != expected:
+		raise ValueError(f'Shard lookup of `{enum_value}` does not match the parsed headers')
+	shards.close()
+	json_sizes['shards.index'] = os.path.getsize(os.path.join(shard_dir, 'index'))
+	emitter_timer = vkparse.StageTimer()
+	with timer.stage('to_rust'):
+		vkparse.to_rust(os.path.join(out_dir, 'vkcore.rs'), parsed, timer = emitter_timer)
+	for name, elapsed in emitter_timer.timings.items():
+		timer.add(f'to_rust:{name}', elapsed)
+	return timer.timings, json_sizes
+
+def measure_peak_memory(out_dir):
+	peaks = {}
+	tracemalloc.start()
+	try:
+		vkparse.parse_registry()
+		peaks['parse_registry'] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.reset_peak()
+		with redirect_stdout(io.StringIO()):
+			parsed, parse_timings, platform_time = vkparse.parse_vulkan_headers()
+		peaks['parse'] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.reset_peak()
+		vkparse.dump_json(parsed, os.path.join(out_dir, 'vkcore.json'))
+		peaks['json.dump'] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.reset_peak()
+		vkparse.to_rust(os.path.join(out_dir, 'vkcore.rs'), parsed)
+		peaks['to_rust'] = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+	try:
+		import resource
+		max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		if sys.platform != 'darwin':
+			max_rss *= 1024
+		peaks['process_max_rss'] = max_rss
+	except ImportError:
+		pass
+	return peaks
+
+def load_history(path):
+	try:
+		with open(path, 'r') as f:
+			return json.load(f)
+	except FileNotFoundError:
+		return []
+
+def baseline_of(history, stage, window):
+	values = sorted(run['stages'][stage] for run in history[-window:] if stage in run['stages'])
+	if not values:
+		return None
+	return values[len(values) // 2]
+
+def main():
+	argp = argparse.ArgumentParser(description = 'Benchmark `vkparse.py` on the bundled headers')
+	argp.add_argument('--repeat', type = int, default = 5, help = 'Run every stage this many times and keep the fastest')
+	argp.add_argument('--history', default = 'bench_history.json', help = 'The JSON file to append the results to')
+	argp.add_argument('--threshold', type = float, default = 0.25, help = 'Fail when a stage is slower than the baseline by this fraction')
+	argp.add_argument('--min-delta', type = float, default = 2.0, help = 'Ignore slowdowns smaller than this many milliseconds')
+	argp.add_argument('--window', type = int, default = 5, help = 'The baseline is the median of this many previous runs')
+	argp.add_argument('--no-memory', action = 'store_true', help = 'Skip the peak memory pass')
+	argp.add_argument('--no-save', action = 'store_true', help = 'Do not append this run to the history file')
+	args = argp.parse_args()
+	history_path = os.path.abspath(args.history)
+	os.chdir(os.path.dirname(os.path.abspath(__file__)))
+	stages = {}
+	with tempfile.TemporaryDirectory() as out_dir:
+		for i in range(args.repeat):
+			timings, json_sizes = run_stages(out_dir)
+			for name, elapsed in timings.items():
+				stages[name] = min(stages.get(name, elapsed), elapsed)
+		peaks = {} if args.no_memory else measure_peak_memory(out_dir)
+	history = load_history(history_path)
+	regressions = []
+	print(f'{"stage":<40} {"time":>10} {"baseline":>10} {"change":>8}')
+	for name, elapsed in stages.items():
+		baseline = baseline_of(history, name, args.window)
+		if baseline is None:
+			print(f'{name:<40} {elapsed * 1000:>8.2f}ms {"-":>10} {"-":>8}')
+			continue
+		change = (elapsed - baseline) / baseline if baseline else 0.0
+		print(f'{name:<40} {elapsed * 1000:>8.2f}ms {baseline * 1000:>8.2f}ms {change * 100:>+7.1f}%')
+		if change > args.threshold and (elapsed - baseline) * 1000 > args.min_delta:
+			regressions += [name]
+	header_time = sum(elapsed for name, elapsed in stages.items() if name.startswith('parse:'))
+	print(f'vk.xml vs headers: {stages["parse_registry"] * 1000:.2f}ms vs {header_time * 1000:.2f}ms ({stages["parse_registry"] / header_time:.2f}x)')
+	for mode, size in json_sizes.items():
+		print(f'vkcore.json size {mode:<23} {size / 1024:>8.1f}KiB')
+	for name, peak in peaks.items():
+		print(f'peak memory {name:<28} {peak / (1024 * 1024):>8.2f}MiB')
+	if not args.no_save:
+		history += [{
+			'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+			'python': platform.python_version(),
+			'repeat': args.repeat,
+			'stages': stages,
+			'json_sizes': json_sizes,
+			'peak_memory': peaks,
+		}]
+		with open(history_path, 'w') as f:
+			json.dump(history, f, indent=4)
+	if regressions:
+		print(f'Regressions over {args.threshold * 100:.0f}%: {", ".join(regressions)}')
+		return 1
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
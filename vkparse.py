@@ -1,55 +1,46 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*
-import io
 import os
+import re
+import sys
+import gzip
 import json
+import lzma
+import mmap
+import time
+import pickle
+import logging
+import logging.handlers
+import hashlib
+import argparse
+from collections import Counter, namedtuple
+from collections.abc import Mapping
+from functools import lru_cache
+from fnmatch import fnmatchcase
+from xml.etree import ElementTree
+from concurrent.futures import ProcessPoolExecutor
 
-# The `pushd()` implementation from `https://gist.github.com/howardhamilton/537e13179489d6896dd3`
-from contextlib import contextmanager
+try:
+	import orjson
+except ImportError:
+	orjson = None
 
-@contextmanager
-def pushd(new_dir):
-	previous_dir = os.getcwd()
-	if len(new_dir):
-		os.chdir(new_dir)
-	try:
-		yield
-	finally:
-		os.chdir(previous_dir)
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+snake_upper_pattern = re.compile(r'(?<![A-Z])(?=[A-Z])')
+snake_underscores_pattern = re.compile(r'__+')
+camel_word_pattern = re.compile(r'_[^a-z]*[a-z]?')
 
 def to_snake(camel_case):
-	ret = ''
-	last_is_upper = False
-	for a in camel_case:
-		if a.isupper():
-			if last_is_upper == False:
-				last_is_upper = True
-				ret += f'_{a.lower()}'
-			else:
-				ret += a.lower()
-		else:
-			if last_is_upper == True:
-				last_is_upper = False
-			ret += a
-	while ret[0] == '_': ret = ret[1:]
-	while '__' in ret: ret = ret.replace('__', '_')
-	return ret
+	ret = snake_upper_pattern.sub('_', camel_case).lower().lstrip('_')
+	return snake_underscores_pattern.sub('_', ret)
 
 def to_camel(snake_case, first_is_upper = False):
-	ret = ''
-	next_should_upper = first_is_upper
-	for a in snake_case.lower():
-		if a == '_':
-			next_should_upper = True
-		elif a.isalpha():
-			if next_should_upper:
-				ret += a.upper()
-				next_should_upper = False
-			else:
-				ret += a
-		else:
-			ret += a
-	return ret
+	snake_case = snake_case.lower()
+	if first_is_upper:
+		snake_case = f'_{snake_case}'
+	return camel_word_pattern.sub(lambda m: m.group().replace('_', '').upper(), snake_case)
 
 def is_good_identifier(text):
 	bad_in_identifier = ' !"#$%&\'()*+,-./:;<=>?@[\\]^`{|}~'
@@ -60,17 +51,480 @@ def is_good_identifier(text):
 			return False
 	return True
 
-def parse(input, initial = {}, is_include_header = 0, handles = [], typedefs = {}, aliases = {}, structs = {}, feature_name = None):
-	ret = initial
-	cur_ver = ''
-	sharp_if_level = 0
+c_type_aliases = {
+	'int8_t': 'i8',
+	'int16_t': 'i16',
+	'int32_t': 'i32',
+	'int64_t': 'i64',
+	'uint8_t': 'u8',
+	'uint16_t': 'u16',
+	'uint32_t': 'u32',
+	'uint64_t': 'u64',
+	'size_t': 'usize',
+	'char': 'i8',
+	'short': 'i16',
+	'int': 'i32',
+	'unsigned': 'u32',
+	'long': 'i64',
+	'float': 'f32',
+	'double': 'f64',
+	'signed char': 'i8',
+	'unsigned char': 'u8',
+	'signed short': 'i16',
+	'unsigned short': 'u16',
+	'signed int': 'i32',
+	'unsigned int': 'u32',
+	'signed long': 'i64',
+	'unsigned long': 'u64',
+	'long long': 'i64',
+	'signed long long': 'i64',
+	'unsigned long long': 'u64',
+	'const char*': "*const i8",
+}
+
+VersionStart = namedtuple('VersionStart', 'version depth first')
+ConstantDecl = namedtuple('ConstantDecl', 'version name value')
+TypedConstantDecl = namedtuple('TypedConstantDecl', 'version name value type')
+TypedefDecl = namedtuple('TypedefDecl', 'version name type')
+HandleDecl = namedtuple('HandleDecl', 'version name dispatchable')
+EnumDecl = namedtuple('EnumDecl', 'version name values')
+UnionDecl = namedtuple('UnionDecl', 'version name members')
+StructDecl = namedtuple('StructDecl', 'version name members')
+FuncProtoDecl = namedtuple('FuncProtoDecl', 'version name ret_type params')
+CommandDecl = namedtuple('CommandDecl', 'version name')
+
+if __name__ in ('__main__', '__mp_main__'):
+	sys.modules.setdefault('vkparse', sys.modules[__name__])
+
+class ModelItem:
+	__slots__ = ()
+	def __init_subclass__(cls):
+		# the parse cache pickles the model, the script and `import vkparse` share it
+		cls.__module__ = 'vkparse'
+	def fields(self):
+		return tuple(getattr(self, field) for field in self._fields)
+	def __eq__(self, other):
+		return self is other or type(self) is type(other) and self.fields() == other.fields()
+	def __repr__(self):
+		return f'{type(self).__name__}{self.fields()!r}'
+
+class Constant(ModelItem):
+	__slots__ = _fields = ('name', 'value', 'type')
+	def __init__(self, name, value, type):
+		self.name = sys.intern(name)
+		self.value = sys.intern(value)
+		self.type = None if type is None else sys.intern(type)
+	@classmethod
+	def from_json(cls, name, value):
+		return cls(name, *value) if isinstance(value, list) else cls(name, value, None)
+	def to_json(self):
+		return self.value if self.type is None else [self.value, self.type]
+
+class Typedef(ModelItem):
+	__slots__ = _fields = ('name', 'type')
+	def __init__(self, name, type):
+		self.name = sys.intern(name)
+		self.type = sys.intern(type)
+	@classmethod
+	def from_json(cls, name, type):
+		return cls(name, type)
+	def to_json(self):
+		return self.type
+
+class Enum(ModelItem):
+	__slots__ = _fields = ('name', 'values')
+	def __init__(self, name, values):
+		intern = sys.intern
+		self.name = intern(name)
+		self.values = {intern(name): intern(value) for name, value in values.items()}
+	@classmethod
+	def from_json(cls, name, values):
+		return cls(name, values)
+	def to_json(self):
+		return dict(self.values)
+
+class Struct(ModelItem):
+	__slots__ = _fields = ('name', 'member_names', 'member_types')
+	def __init__(self, name, member_names, member_types):
+		self.name = sys.intern(name)
+		self.member_names = tuple(map(sys.intern, member_names))
+		self.member_types = tuple(map(sys.intern, member_types))
+	@classmethod
+	def from_json(cls, name, members):
+		return cls(name, members, members.values())
+	def members(self):
+		return zip(self.member_names, self.member_types)
+	def to_json(self):
+		return dict(self.members())
+
+class Union(Struct):
+	__slots__ = ()
+
+class Command(ModelItem):
+	__slots__ = _fields = ('name', 'ret_type', 'param_names', 'param_types')
+	def __init__(self, name, ret_type, param_names, param_types):
+		self.name = sys.intern(name)
+		self.ret_type = sys.intern(ret_type)
+		self.param_names = tuple(map(sys.intern, param_names))
+		self.param_types = tuple(map(sys.intern, param_types))
+	@classmethod
+	def from_json(cls, name, proto):
+		return cls(name, proto['ret_type'], proto['params'], proto['params'].values())
+	def params(self):
+		return zip(self.param_names, self.param_types)
+	def to_json(self):
+		return {'ret_type': self.ret_type, 'params': dict(self.params())}
+
+model_sections = {
+	'typedefs': Typedef,
+	'constants': Constant,
+	'typed_constants': Constant,
+	'enums': Enum,
+	'unions': Union,
+	'structs': Struct,
+	'func_protos': Command,
+}
+
+parse_counters = Counter()
+current_counters = ContextVar('current_counters', default = parse_counters)
+
+logger = logging.getLogger('vkparse')
+log_categories = ('include', 'header', 'handle', 'filtered', 'unknown')
+log_events = {
+	'include_directives': ('include', logging.INFO),
+	'includes_skipped': ('include', logging.INFO),
+	'headers': ('header', logging.INFO),
+	'handle_definitions': ('handle', logging.INFO),
+	'skip_filtered_code': ('filtered', logging.INFO),
+	'unknown_enum_data': ('unknown', logging.WARNING),
+	'unknown_union_data': ('unknown', logging.WARNING),
+	'unknown_struct_data': ('unknown', logging.WARNING),
+	'unknown_function_declaration_data': ('unknown', logging.WARNING),
+	'unknown_function_prototype_data': ('unknown', logging.WARNING),
+	'unknown_typedef_data': ('unknown', logging.WARNING),
+	'unknown_struct': ('unknown', logging.WARNING),
+	'unknown_line': ('unknown', logging.WARNING),
+	'unknown_constant_expression': ('unknown', logging.WARNING),
+}
+log_events = {event: (logging.getLogger(f'vkparse.{category}'), level) for event, (category, level) in log_events.items()}
+
+def configure_logging(verbose = False, enabled = (), muted = ()):
+	target = logging.StreamHandler(sys.stdout)
+	target.setFormatter(logging.Formatter('%(indent)s%(message)s', defaults = {'indent': ''}))
+	handler = logging.handlers.MemoryHandler(1 << 20, logging.CRITICAL + 1, target)
+	logger.handlers = [handler]
+	logger.propagate = False
+	logger.setLevel(logging.INFO if verbose else logging.WARNING)
+	for category in enabled:
+		logging.getLogger(f'vkparse.{category}').setLevel(logging.INFO)
+	for category in muted:
+		logging.getLogger(f'vkparse.{category}').setLevel(logging.CRITICAL + 1)
+	return handler
+
+captured_log = ContextVar('captured_log', default = None)
+
+@contextmanager
+def capture_log():
+	records = []
+	token = captured_log.set(records)
+	try:
+		yield records
+	finally:
+		captured_log.reset(token)
+
+def log_message(log, level, message, extra):
+	records = captured_log.get()
+	if records is not None:
+		records += [log.makeRecord(log.name, level, __file__, 0, message, None, None, extra = extra)]
+	elif log.isEnabledFor(level):
+		log.log(level, message, extra = extra)
+
+def replay_log(records):
+	captured = captured_log.get()
+	if captured is not None:
+		captured += records
+		return
+	for record in records:
+		log = logging.getLogger(record.name)
+		if log.isEnabledFor(record.levelno):
+			log.handle(record)
+
+@contextmanager
+def collect_counters():
+	counters = Counter()
+	token = current_counters.set(counters)
+	try:
+		yield counters
+	finally:
+		current_counters.reset(token)
+
+def iter_declarations(input, is_include_header = 0, included = None):
+	yield from scan_declarations(input, is_include_header, 0, included)
+
+comment_pattern = re.compile(r'/(?:\*(.*?)\*/|\*(.*)|/(?:[^\n/]+|/(?!\*)|/\*[^\n]*?\*/)*)[^\S\n]*', re.S)
+bitfield_colon_pattern = re.compile(r' *: *')
+line_kind_pattern = re.compile(r'''
+	(?P<if_protos>\#ifndef[ ]VK_NO_PROTOTYPES)
+	|(?P<if_unwanted>\#ifdef[ ](?:__cplusplus|__OBJC__))
+	|(?P<if>\#if[ ]|\#ifdef[ ]|\#ifndef[ ])
+	|(?P<else>\#else)
+	|(?P<endif>\#endif)
+	|(?P<include>\#include)
+	|(?P<define>\#define[ ])
+	|(?P<close>\})
+	|(?P<typedef_enum>typedef[ ]enum[ ])
+	|(?P<typedef_union>typedef[ ]union[ ])
+	|(?P<typedef_struct>typedef[ ]struct[ ])
+	|(?P<typedef>typedef[ ])
+	|(?P<struct>struct[ ])
+	|(?P<static_const>static[ ]const[ ])
+	|(?P<vkapi_attr>VKAPI_ATTR[ ])
+	|(?P<handle>VK_DEFINE_HANDLE)
+	|(?P<non_dispatchable_handle>VK_DEFINE_NON_DISPATCHABLE_HANDLE)
+''', re.X)
+
+def strip_comments(text, final = True):
+	parts = []
+	pos = 0
+	for m in comment_pattern.finditer(text):
+		comment, unterminated = m.group(1, 2)
+		if unterminated is not None and not final:
+			line_start = text.rfind('\n', 0, m.start()) + 1
+			return strip_comments(text[:line_start])[0], text[line_start:]
+		parts += [text[pos:m.start()].rstrip(' \t\f\v')]
+		if comment is not None:
+			if '\n' in comment:
+				parts += ['\n' + '\0\n' * (comment.count('\n') - 1)]
+			else:
+				parts += [' ']
+		elif unterminated is not None:
+			parts += ['\n\0' * unterminated.count('\n')]
+		pos = m.end()
+	parts += [text[pos:]]
+	current_counters.get()['comments_stripped'] += len(parts) - 1
+	return ''.join(parts), ''
+
+def iter_logical_lines(input, block_size = 1 << 16):
+	last_line = ''
+	line_no = 0
+	lines_scanned = 0
+	rest = ''
+	with open(input, 'r') as f:
+		while True:
+			block = f.read(block_size)
+			if block:
+				text = rest + block
+				end = text.rfind('\n') + 1
+				tail = text[end:]
+				text, rest = strip_comments(text[:end], False)
+				rest += tail
+			else:
+				text, rest = strip_comments(rest)
+			lines = text.split('\n')
+			if not lines[-1]:
+				lines.pop()
+			for line in lines:
+				line_no += 1
+				if line == '\0':
+					continue
+				line = line.rstrip()
+				trimmed_line = line.lstrip()
+				indent = len(line) - len(trimmed_line)
+				if last_line:
+					line = (last_line + ' ' + trimmed_line).lstrip()
+					last_line = ''
+				else:
+					line = trimmed_line
+				if not line:
+					continue
+				if line[-1] == '\\':
+					last_line += line[:-1]
+					continue
+				lines_scanned += 1
+				yield line_no, indent, line
+			if not block:
+				break
+	current_counters.get()['lines_scanned'] += lines_scanned
+
+constant_token_pattern = re.compile(r'\s*(?:((?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?|\d+[eE][-+]?\d+)([fF]?)|(0[xX][0-9A-Fa-f]+|\d+)([uUlL]*)|"([^"]*)"|([A-Za-z_]\w*)|(<<|>>|[-+*/%~&|^(),]))')
+constant_int_types = {
+	'int32_t': (32, True),
+	'uint32_t': (32, False),
+	'int64_t': (64, True),
+	'uint64_t': (64, False),
+}
+constant_cast_types = {
+	'int': 'int32_t',
+	'unsigned': 'uint32_t',
+	'float': 'float',
+	'double': 'double',
+} | {type: type for type in constant_int_types}
+constant_literal_pattern = re.compile(r'[-~]?(?:0[xX][0-9A-Fa-f]+|\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)[uUlLfF]*|"[^"]*"')
+constant_binary_ops = {'|': 1, '^': 2, '&': 3, '<<': 4, '>>': 4, '+': 5, '-': 5, '*': 6, '/': 6, '%': 6}
+constant_macros = {
+	'VK_MAKE_VERSION': lambda major, minor, patch: (major << 22) | (minor << 12) | patch,
+	'VK_MAKE_API_VERSION': lambda variant, major, minor, patch: (variant << 29) | (major << 22) | (minor << 12) | patch,
+	'VK_MAKE_VIDEO_STD_VERSION': lambda major, minor, patch: (major << 22) | (minor << 12) | patch,
+}
+constant_macro_names = tuple(constant_macros)
+
+def wrap_int(value, type):
+	bits, signed = constant_int_types[type]
+	value &= (1 << bits) - 1
+	if signed and value >> (bits - 1):
+		value -= 1 << bits
+	return value
+
+def int_literal_type(value, suffix, is_hex):
+	suffix = suffix.lower()
+	if 'u' in suffix:
+		candidates = ('uint64_t',) if 'll' in suffix else ('uint32_t', 'uint64_t')
+	elif 'll' in suffix:
+		candidates = ('int64_t', 'uint64_t') if is_hex else ('int64_t',)
+	else:
+		candidates = ('int32_t', 'uint32_t', 'int64_t', 'uint64_t') if is_hex else ('int32_t', 'int64_t')
+	for type in candidates:
+		if wrap_int(value, type) == value:
+			return type
+	return candidates[-1]
+
+def common_type(left, right):
+	if left in ('float', 'double') or right in ('float', 'double'):
+		return 'double' if 'double' in (left, right) else 'float'
+	if left == right:
+		return left
+	(left_bits, left_signed), (right_bits, right_signed) = constant_int_types[left], constant_int_types[right]
+	if left_signed == right_signed:
+		return left if left_bits > right_bits else right
+	signed, unsigned = (left, right) if left_signed else (right, left)
+	if constant_int_types[unsigned][0] >= constant_int_types[signed][0]:
+		return unsigned
+	return signed
+
+class ConstantEvaluator:
+	def __init__(self, resolve):
+		self.resolve = resolve
+
+	def evaluate(self, expr):
+		if expr.isdigit() and (expr[0] != '0' or expr == '0'):
+			value = int(expr)
+			return value, int_literal_type(value, '', False)
+		tokens = []
+		pos = 0
+		expr = expr.rstrip()
+		while pos < len(expr):
+			m = constant_token_pattern.match(expr, pos)
+			if m is None:
+				raise ValueError(f'Can not evaluate `{expr}`: unexpected `{expr[pos:]}`')
+			tokens += [m.groups()]
+			pos = m.end()
+		(value, type), pos = self.binary(expr, tokens, 0, 0)
+		if pos != len(tokens):
+			raise ValueError(f'Can not evaluate `{expr}`: unexpected token at {pos}')
+		return value, type
+
+	def binary(self, expr, tokens, pos, min_prec):
+		(left, left_type), pos = self.unary(expr, tokens, pos)
+		while pos < len(tokens):
+			op = tokens[pos][6]
+			prec = constant_binary_ops.get(op)
+			if prec is None or prec <= min_prec:
+				break
+			(right, right_type), pos = self.binary(expr, tokens, pos + 1, prec)
+			left, left_type = self.apply(expr, op, left, left_type, right, right_type)
+		return (left, left_type), pos
+
+	def apply(self, expr, op, left, left_type, right, right_type):
+		if left_type == 'const char*' or right_type == 'const char*':
+			raise ValueError(f'Can not evaluate `{expr}`: `{op}` on a string')
+		if op in ('<<', '>>'):
+			if left_type not in constant_int_types or right_type not in constant_int_types:
+				raise ValueError(f'Can not evaluate `{expr}`: `{op}` on a float')
+			return wrap_int(left << right if op == '<<' else left >> right, left_type), left_type
+		type = common_type(left_type, right_type)
+		if type in ('float', 'double'):
+			if op in ('|', '^', '&', '%'):
+				raise ValueError(f'Can not evaluate `{expr}`: `{op}` on a float')
+			return {'+': left + right, '-': left - right, '*': left * right, '/': left / right}[op], type
+		left, right = wrap_int(left, type), wrap_int(right, type)
+		if op in ('/', '%'):
+			quotient = abs(left) // abs(right)
+			if (left < 0) != (right < 0):
+				quotient = -quotient
+			value = quotient if op == '/' else left - right * quotient
+		else:
+			value = {'|': left | right, '^': left ^ right, '&': left & right, '+': left + right, '-': left - right, '*': left * right}[op]
+		return wrap_int(value, type), type
+
+	def unary(self, expr, tokens, pos):
+		if pos >= len(tokens):
+			raise ValueError(f'Can not evaluate `{expr}`: unexpected end')
+		float_text, float_suffix, int_text, int_suffix, string, ident, op = tokens[pos]
+		if float_text is not None:
+			return (float(float_text), 'float' if float_suffix else 'double'), pos + 1
+		if int_text is not None:
+			is_hex = int_text[1:2] in ('x', 'X')
+			value = int(int_text, 16 if is_hex else 8 if int_text[0] == '0' else 10)
+			return (value, int_literal_type(value, int_suffix, is_hex or int_text[0] == '0')), pos + 1
+		if string is not None:
+			return (string, 'const char*'), pos + 1
+		if ident is not None:
+			try:
+				macro = constant_macros[ident]
+			except KeyError:
+				try:
+					return self.resolve(ident), pos + 1
+				except KeyError:
+					raise ValueError(f'Can not evaluate `{expr}`: unknown `{ident}`') from None
+			args = []
+			pos += 1
+			if pos >= len(tokens) or tokens[pos][6] != '(':
+				raise ValueError(f'Can not evaluate `{expr}`: `{ident}` without arguments')
+			while pos < len(tokens) and tokens[pos][6] in ('(', ','):
+				(value, type), pos = self.binary(expr, tokens, pos + 1, 0)
+				args += [value]
+			if pos >= len(tokens) or tokens[pos][6] != ')' or len(args) != macro.__code__.co_argcount:
+				raise ValueError(f'Can not evaluate `{expr}`: bad arguments of `{ident}`')
+			return (wrap_int(macro(*args), 'uint32_t'), 'uint32_t'), pos + 1
+		if op == '(':
+			cast_type = constant_cast_types.get(tokens[pos + 1][5]) if pos + 2 < len(tokens) else None
+			if cast_type is not None and tokens[pos + 2][6] == ')':
+				(value, type), pos = self.unary(expr, tokens, pos + 3)
+				if cast_type in ('float', 'double'):
+					return (float(value), cast_type), pos
+				return (wrap_int(int(value), cast_type), cast_type), pos
+			(value, type), pos = self.binary(expr, tokens, pos + 1, 0)
+			if pos >= len(tokens) or tokens[pos][6] != ')':
+				raise ValueError(f'Can not evaluate `{expr}`: unclosed `(`')
+			return (value, type), pos + 1
+		(value, type), next_pos = self.unary(expr, tokens, pos + 1)
+		if op == '+':
+			return (value, type), next_pos
+		if op == '-':
+			return (-value if type in ('float', 'double') else wrap_int(-value, type), type), next_pos
+		if op == '~' and type in constant_int_types:
+			return (wrap_int(~value, type), type), next_pos
+		raise ValueError(f'Can not evaluate `{expr}`: unexpected `{op}`')
+
+def define_value(value):
+	while f'{value[0]}{value[-1]}' == '()':
+		value = value[1:-1]
+	return value
+
+def resolve_include(input, include_file):
+	return os.path.normpath(os.path.join(os.path.dirname(input), include_file))
+
+def scan_declarations(input, is_include_header, depth, included = None):
+	if included is None:
+		included = set()
+	included.add(os.path.normpath(input))
+	cur_ver = None
 	is_enum = False
 	is_union = False
 	is_struct = False
 	is_proto = False
 	is_unwanted = False
 	is_typedef_func = False
-	is_multiline_comment = False
 	macro_conditions = []
 	macro_isprotos = []
 	cur_func = {}
@@ -81,377 +535,962 @@ def parse(input, initial = {}, is_include_header = 0, handles = [], typedefs = {
 	cur_enum_name = ''
 	cur_union_name = ''
 	cur_struct_name = ''
-	all_enum_names = set()
-	all_enum_values = {}
-	all_const_values = {}
-	all_struct_names = set()
-	must_alias = {
-		'int8_t': 'i8',
-		'int16_t': 'i16',
-		'int32_t': 'i32',
-		'int64_t': 'i64',
-		'uint8_t': 'u8',
-		'uint16_t': 'u16',
-		'uint32_t': 'u32',
-		'uint64_t': 'u64',
-		'size_t': 'usize',
-		'char': 'i8',
-		'short': 'i16',
-		'int': 'i32',
-		'unsigned': 'u32',
-		'long': 'i64',
-		'float': 'f32',
-		'double': 'f64',
-		'signed char': 'i8',
-		'unsigned char': 'u8',
-		'signed short': 'i16',
-		'unsigned short': 'u16',
-		'signed int': 'i32',
-		'unsigned int': 'u32',
-		'signed long': 'i64',
-		'unsigned long': 'u64',
-		'long long': 'i64',
-		'signed long long': 'i64',
-		'unsigned long long': 'u64',
-		'const char*': "*const i8",
-	}
-	must_alias |= aliases
-	try:
-		metadata = ret['metadata']
-		all_enum_names |= set(metadata['all_enum_names'])
-		all_enum_values = metadata['all_enum_values']
-		all_const_values = metadata['all_const_values']
-		all_struct_names |= set(metadata['all_struct_names'])
-		must_alias |= metadata['must_alias']
-	except KeyError:
-		pass
 	enabled = False
+	intern = sys.intern
 	if is_include_header:
 		enabled = True
-	last_line = ''
 	echo_indent = '    ' * is_include_header
-	cur_ver = None
-	with open(input, 'r') as f:
-		line_no = 0
-		for line in f:
-			line_no += 1
-			if is_multiline_comment:
-				if '*/' in line:
-					line = line.split('*/', 1)[1].lstrip()
-					is_multiline_comment = False
-				else:
-					continue
-			while '/*' in line:
-				if '*/' in line:
-					left, right = line.split('/*', 1)
-					line = left.rstrip() + ' ' + right.split('*/', 1)[1].lstrip()
-				else:
-					line = line.split('/*', 1)[0].rstrip()
-					is_multiline_comment = True
-			line = line.split('//', 1)[0].rstrip()
-			trimmed_line = line.lstrip()
-			indent = len(line) - len(trimmed_line)
-			line = (last_line + ' ' + trimmed_line).lstrip()
-			last_line = ''
-			if line is None or len(line) == 0:
-				continue
-			if line.endswith('\\'):
-				last_line += line[:-1]
-				continue
-			if line.startswith(('#if ', '#ifdef ', '#ifndef ')):
-				sharp_if_level += 1
+	counters = current_counters.get()
+	def report(event, message):
+		counters[event] += 1
+		log, level = log_events[event]
+		log_message(log, level, message, {'indent': echo_indent, 'input': input, 'line_no': line_no})
+	for line_no, indent, line in iter_logical_lines(input):
+		m = line_kind_pattern.match(line)
+		kind = m.lastgroup if m is not None else None
+		if line[0] == '#':
+			if kind in ('if', 'if_protos', 'if_unwanted'):
 				macro_conditions += [is_unwanted]
 				macro_isprotos += [is_proto]
-				if line.startswith('#ifndef VK_NO_PROTOTYPES'):
+				if kind == 'if_protos':
 					is_proto = True
-				elif line.startswith(('#ifdef __cplusplus', '#ifdef __OBJC__')):
+				elif kind == 'if_unwanted':
 					is_unwanted = True
 				continue
-			if line.startswith("#else"):
+			if kind == 'else':
 				is_unwanted = not is_unwanted
 				continue
-			if line.startswith('#endif'):
-				sharp_if_level -= 1
+			if kind == 'endif':
 				is_proto = macro_isprotos.pop()
 				is_unwanted = macro_conditions.pop()
 				continue
-			if line.startswith('#include'):
-				print(echo_indent, end='')
-				print(line)
+			if kind == 'include':
+				report('include_directives', line)
 				if '<' in line or '>' in line:
 					continue
-				include_file = line.split('"', 2)[1]
-				include_path = os.path.dirname(include_file)
-				include_file = os.path.basename(include_file)
-				if include_file == 'vk_platform.h':
-					print(echo_indent, end='')
-					print('Skipped: "vk_platform.h"')
+				include_file = resolve_include(input, line.split('"', 2)[1])
+				if os.path.basename(include_file) == 'vk_platform.h':
+					report('includes_skipped', 'Skipped: "vk_platform.h"')
 					continue
-				with pushd(include_path):
-					ret['metadata'] = {
-						'all_enum_names': all_enum_names,
-						'all_enum_values': all_enum_values,
-						'all_const_values': all_const_values,
-						'all_struct_names': all_struct_names,
-						'must_alias': must_alias,
-					}
-					parsed = parse(include_file, ret, is_include_header + 1)
-					metadata = parsed['metadata'].copy()
-					del parsed['metadata']
-					ret |= parsed
-					all_enum_names |= set(metadata['all_enum_names'])
-					all_enum_values |= metadata['all_enum_values']
-					all_const_values |= metadata['all_const_values']
-					all_struct_names |= set(metadata['all_struct_names'])
-					must_alias |= metadata['must_alias']
-				continue
-			if enabled == False:
-				if line.startswith('#define VK_VERSION_1_0 1'):
-					enabled = True
-				else:
+				if include_file in included:
+					report('includes_skipped', f'Skipped: "{include_file}", already included')
 					continue
+				counters['includes_followed'] += 1
+				yield from scan_declarations(include_file, is_include_header + 1, depth + 1, included)
+				continue
+		if enabled == False:
+			if line.startswith('#define VK_VERSION_1_0 1'):
+				enabled = True
+			else:
+				continue
+		if kind == 'define':
 			if line.startswith(('#define VK_', '#define vulkan_')) and line.endswith(' 1') and indent == 0 and '_SPEC_VERSION ' not in line:
 				is_first_ver = False
 				if cur_ver is None:
 					is_first_ver = True
 				cur_ver = line.split(' ', 2)[1]
-				ret[cur_ver] = {
-					'typedefs': {},
-					'handles': [],
-					'non_dispatchable_handles': [],
-					'constants': {},
-					'typed_constants': {},
-					'enums': {},
-					'unions': {},
-					'structs': {},
-					'funcs': [],
-					'func_protos': {},
-				}
-				if is_first_ver:
-					ret[cur_ver]['handles'] = list(set(ret[cur_ver]['handles']) | set(handles))
-					ret[cur_ver]['typedefs'] |= typedefs
-					ret[cur_ver]['structs'] |= structs
-				if feature_name is not None:
-					ret[cur_ver]['feature'] = feature_name
+				yield VersionStart(cur_ver, depth, is_first_ver)
 				continue
 			if is_unwanted:
-				print(echo_indent, end='')
-				print(f'Skip filtered code: {line}')
+				report('skip_filtered_code', f'Skip filtered code: {line}')
 				continue
-			if line.startswith('#define ') and line.endswith('_H_ 1'):
-				print(echo_indent, end='')
-				print(f'Header: {line}')
+			if line.endswith('_H_ 1'):
+				report('headers', f'Header: {line}')
 				continue
-			if cur_ver == '':
-				print(echo_indent, end='')
-				print(f'Unversioned line: {line}')
-				continue
-			if line.startswith('#define '):
-				parts = line.split(' ', 2)
-				ident, value = parts[1], parts[2].strip()
-				if '(' in ident or ')' in ident or ident == 'VK_USE_64_BIT_PTR_DEFINES':
-					continue
-				while f'{value[0]}{value[-1]}' == '()':
-					value = value[1:-1]
-				def try_redir(ident):
-					ident = ident.strip()
-					try:
-						val = all_const_values[ident]
-					except KeyError:
-						val = ident
-					return int(val)
-				def vk_make_version(major_minor_patch):
-					major, minor, patch = major_minor_patch.split('(', 1)[1].split(')', 1)[0].split(',')
-					major, minor, patch = try_redir(major), try_redir(minor), try_redir(patch)
-					return hex((major << 22) | (minor << 12) | patch)
-				def vk_make_api_version(variant_major_minor_patch):
-					variant, major, minor, patch = variant_major_minor_patch.split('(', 1)[1].split(')', 1)[0].split(',')
-					variant, major, minor, patch = try_redir(variant), try_redir(major), try_redir(minor), try_redir(patch)
-					return hex((variant << 29) | (major << 22) | (minor << 12) | patch)
-				def vk_make_video_std_version(major_minor_patch):
-					major, minor, patch = major_minor_patch.split('(', 1)[1].split(')', 1)[0].split(',')
-					major, minor, patch = try_redir(major), try_redir(minor), try_redir(patch)
-					return hex((major << 22) | (minor << 12) | patch)
-				if value.startswith('VK_MAKE_VERSION'):
-					value = vk_make_version(value[len('VK_MAKE_VERSION'):])
-				elif value.startswith('VK_MAKE_API_VERSION'):
-					value = vk_make_api_version(value[len('VK_MAKE_API_VERSION'):])
-				elif value.startswith('VK_MAKE_VIDEO_STD_VERSION'):
-					value = vk_make_video_std_version(value[len('VK_MAKE_VIDEO_STD_VERSION'):])
-				if ident != cur_ver:
-					ret[cur_ver]['constants'][ident] = value
-					all_const_values |= {ident: value}
+			parts = line.split(' ', 2)
+			ident, value = parts[1], parts[2].strip()
+			if '(' in ident or ')' in ident or ident == 'VK_USE_64_BIT_PTR_DEFINES':
 				continue
-			if is_enum:
-				if line.startswith('}'):
-					is_enum = False
-					ret[cur_ver]['enums'][cur_enum_name] = cur_enum
-					cur_enum = {}
-					continue
-				if '=' in line:
-					if line.endswith(','):
-						line = line[:-1]
-					name, value = line.split('=', 1)
-					cur_enum |= {name.strip(): value.strip()}
-					all_enum_values |= {name.strip(): [value.strip(), cur_enum_name]}
-				else:
-					print(echo_indent, end='')
-					print(f'Unknown data in enum at line {line_no}: {line}')
+			value = define_value(value)
+			if ident != cur_ver:
+				yield ConstantDecl(cur_ver, ident, value)
+			continue
+		if is_unwanted:
+			report('skip_filtered_code', f'Skip filtered code: {line}')
+			continue
+		if is_enum:
+			if kind == 'close':
+				is_enum = False
+				yield EnumDecl(cur_ver, cur_enum_name, cur_enum)
+				cur_enum = {}
 				continue
-			elif is_union:
-				if line.startswith('}'):
-					is_union = False
-					ret[cur_ver]['unions'][cur_union_name] = cur_union
-					cur_union = {}
-					continue
-				if line.endswith(';'):
+			if '=' in line:
+				if line.endswith(','):
 					line = line[:-1]
-					type, name = line.rsplit(' ', 1)
-					cur_union |= {name.strip(): type.strip()}
+				name, value = line.split('=', 1)
+				cur_enum[intern(name.strip())] = value.strip()
+			else:
+				report('unknown_enum_data', f'Unknown data in enum at line {line_no}: {line}')
+			continue
+		elif is_union:
+			if kind == 'close':
+				is_union = False
+				yield UnionDecl(cur_ver, cur_union_name, cur_union)
+				cur_union = {}
+				continue
+			if line.endswith(';'):
+				line = line[:-1]
+				type, name = line.rsplit(' ', 1)
+				cur_union[intern(name.strip())] = intern(type.strip())
+			else:
+				report('unknown_union_data', f'Unknown data in union at line {line_no}: {line}')
+			continue
+		elif is_struct:
+			if kind == 'close':
+				is_struct = False
+				yield StructDecl(cur_ver, cur_struct_name, cur_struct)
+				cur_struct = {}
+				continue
+			if ':' in line:
+				line = bitfield_colon_pattern.sub(':', line)
+			if line.endswith(';'):
+				line = line[:-1]
+				type, name = line.rsplit(' ', 1)
+				cur_struct[intern(name.strip())] = intern(type.strip())
+			else:
+				report('unknown_struct_data', f'Unknown data in struct at line {line_no}: {line}')
+			continue
+		elif is_proto:
+			if kind == 'vkapi_attr':
+				if line.endswith('('):
+					yield CommandDecl(cur_ver, line[:-1].rsplit(' ', 1)[-1])
 				else:
-					print(echo_indent, end='')
-					print(f'Unknown data in union at line {line_no}: {line}')
+					report('unknown_function_declaration_data', f'Unknown data in function declaration at line {line_no}: {line}')
+			continue
+		elif is_typedef_func:
+			if line.endswith(');'):
+				is_typedef_func = False
+				line = line[:-2]
+			elif line.endswith(','):
+				line = line[:-1]
+			for param in line.split(','):
+				param_type, param_name = param.rsplit(' ', 1)
+				cur_func['params'][intern(param_name.strip())] = intern(param_type.strip())
+			if is_typedef_func == False:
+				yield FuncProtoDecl(cur_ver, cur_func_name, cur_func['ret_type'], cur_func['params'])
+				cur_func = {}
+			continue
+		else:
+			if kind == 'typedef_enum':
+				is_enum = True
+				cur_enum_name = line[len('typedef enum '):].split(' ', 1)[0]
+				cur_enum = {}
 				continue
-			elif is_struct:
-				while ' :' in line or ': ' in line:
-					line = line.replace(' :', ':').replace(': ', ':')
-				if line.startswith('}'):
-					is_struct = False
-					ret[cur_ver]['structs'][cur_struct_name] = cur_struct
-					cur_struct = {}
-					continue
-				if line.endswith(';'):
-					line = line[:-1]
-					type, name = line.rsplit(' ', 1)
-					cur_struct |= {name.strip(): type.strip()}
+			if kind == 'typedef_union':
+				is_union = True
+				cur_union_name = line[len('typedef union '):].split(' ', 1)[0]
+				cur_union = {}
+				continue
+			if kind == 'typedef_struct':
+				if line[-1] == ';' and '{' not in line and '*' in line:
+					handle_name = line.rsplit(' ', 1)[-1][:-1].strip()
+					report('handle_definitions', f'Parsed `{line}` as handle definition: {handle_name}')
+					yield HandleDecl(cur_ver, handle_name, True)
 				else:
-					print(echo_indent, end='')
-					print(f'Unknown data in struct at line {line_no}: {line}')
+					is_struct = True
+					cur_struct = {}
+					cur_struct_name = line[len('typedef struct '):].split(' ', 1)[0]
 				continue
-			elif is_proto:
-				if line.startswith('VKAPI_ATTR '):
+			if kind == 'typedef':
+				if 'VKAPI_PTR' in line:
+					cur_func_name = line.split('VKAPI_PTR *', 1)[1].split(')', 1)[0]
 					if line.endswith('('):
-						ret[cur_ver]['funcs'] += [line[:-1].rsplit(' ', 1)[-1]]
+						is_typedef_func = True
+						params = {}
+					elif line.endswith(');'):
+						params = {}
+						for param in line.split(f'{cur_func_name})(', 1)[1].rsplit(')', 1)[0].split(','):
+							if param == 'void':
+								pass
+							elif ' ' in param:
+								type, name = param.rsplit(' ', 1)
+								params |= {name.strip(): type.strip()}
+							else:
+								params |= {f'_param_{params.len()}': type.strip()}
+					else:
+						report('unknown_function_prototype_data', f'Unknown data in function prototype at line {line_no}: {line}')
+						continue
+					cur_func = {
+						'ret_type': line[len('typedef '):].split('(', 1)[0].strip(),
+						'params': params,
+					}
+					if is_typedef_func == False:
+						yield FuncProtoDecl(cur_ver, cur_func_name, cur_func['ret_type'], cur_func['params'])
+						cur_func = {}
+				else:
+					if line.endswith(';'):
+						line = line[:-1]
+						type, name = line[len('typedef '):].rsplit(' ', 1)
+						yield TypedefDecl(cur_ver, name, type)
 					else:
-						print(echo_indent, end='')
-						print(f'Unknown data in function declaration at line {line_no}: {line}')
+						report('unknown_typedef_data', f'Unknown data in typedef at line {line_no}: {line}')
 				continue
-			elif is_typedef_func:
-				if line.endswith(');'):
-					is_typedef_func = False
-					line = line[:-2]
-				elif line.endswith(','):
-					line = line[:-1]
-				for param in line.split(','):
-					param_type, param_name = param.rsplit(' ', 1)
-					cur_func['params'] |= {param_name.strip(): param_type.strip()}
-				if is_typedef_func == False:
-					ret[cur_ver]['func_protos'][cur_func_name] = cur_func.copy()
-					cur_func = {}
+			if kind == 'struct' and line[-1] == ';':
+				identifier = line[len('struct '):-1]
+				if is_good_identifier(identifier):
+					report('handle_definitions', f'Parsed `{line}` as handle definition: {identifier}')
+					yield HandleDecl(cur_ver, identifier, True)
+				else:
+					report('unknown_struct', f'Unknown struct at line {line_no}: {line}')
+				continue
+			if kind == 'static_const' and line[-1] == ';':
+				type_ident, value = line[len('static const '):-1].split('=')
+				type_, ident = type_ident.strip().split(' ', 1)
+				value = value.strip()
+				yield TypedConstantDecl(cur_ver, ident, value, type_)
 				continue
+			if kind == 'handle':
+				handle_name = line.split('(', 1)[1].split(')', 1)[0]
+				yield HandleDecl(cur_ver, handle_name, True)
+				continue
+			if kind == 'non_dispatchable_handle':
+				handle_name = line.split('(', 1)[1].split(')', 1)[0]
+				yield HandleDecl(cur_ver, handle_name, False)
+				continue
+			report('unknown_line', f'Unknown line {line_no}: {line}')
+
+def parse(input, initial = None, is_include_header = 0, handles = [], typedefs = {}, aliases = {}, structs = {}, feature_name = None, cache = None, base_key = None, included = None):
+	if cache is not None:
+		return cache.parse(input, initial, is_include_header, handles, typedefs, aliases, structs, feature_name, base_key, included)
+	return build_versions(iter_declarations(input, is_include_header, included), initial, handles, typedefs, aliases, structs, feature_name)
+
+def build_versions(declarations, initial = None, handles = [], typedefs = {}, aliases = {}, structs = {}, feature_name = None):
+	ret = {} if initial is None else initial
+	all_enum_names = set()
+	all_enum_values = {}
+	all_const_values = {}
+	all_struct_names = set()
+	must_alias = dict(c_type_aliases)
+	must_alias |= aliases
+	try:
+		metadata = ret['metadata']
+		all_enum_names = metadata['all_enum_names']
+		all_enum_values = metadata['all_enum_values']
+		all_const_values = metadata['all_const_values']
+		all_struct_names = metadata['all_struct_names']
+		must_alias |= metadata['must_alias']
+	except KeyError:
+		pass
+	resolve = constant_resolver(all_const_values, all_enum_values, {}, warn = False)
+	for decl in declarations:
+		kind = type(decl)
+		if kind is VersionStart:
+			ret[decl.version] = {
+				'typedefs': {},
+				'handles': [],
+				'non_dispatchable_handles': [],
+				'constants': {},
+				'typed_constants': {},
+				'enums': {},
+				'unions': {},
+				'structs': {},
+				'funcs': [],
+				'func_protos': {},
+			}
+			if decl.depth == 0:
+				if decl.first:
+					ret[decl.version]['handles'] = list(dict.fromkeys(ret[decl.version]['handles'] + handles))
+					ret[decl.version]['typedefs'] |= {name: Typedef(name, type) for name, type in typedefs.items()}
+					ret[decl.version]['structs'] |= {name: Struct.from_json(name, members) for name, members in structs.items()}
+				if feature_name is not None:
+					ret[decl.version]['feature'] = feature_name
+			continue
+		verdata = ret[decl.version]
+		if kind is ConstantDecl:
+			all_const_values[decl.name] = decl.value
+			if decl.value.startswith(constant_macro_names):
+				value = resolve(decl.name)[0]
+				if value is not None:
+					all_const_values[decl.name] = hex(value)
+			verdata['constants'][decl.name] = Constant(decl.name, all_const_values[decl.name], None)
+		elif kind is TypedConstantDecl:
+			verdata['typed_constants'][decl.name] = Constant(decl.name, decl.value, decl.type)
+			all_const_values[decl.name] = decl.value
+		elif kind is TypedefDecl:
+			verdata['typedefs'][decl.name] = Typedef(decl.name, decl.type)
+		elif kind is HandleDecl:
+			if decl.dispatchable:
+				verdata['handles'] += [decl.name]
 			else:
-				if line.startswith('typedef enum '):
-					is_enum = True
-					cur_enum_name = line[len('typedef enum '):].split(' ', 1)[0]
-					cur_enum = {}
-					all_enum_names |= {cur_enum_name}
-					continue
-				if line.startswith('typedef union '):
-					is_union = True
-					cur_union_name = line[len('typedef union '):].split(' ', 1)[0]
-					cur_union = {}
-					continue
-				if line.startswith('typedef struct '):
-					if line[-1] == ';' and '{' not in line and '*' in line:
-						handle_name = line.rsplit(' ', 1)[-1][:-1].strip()
-						ret[cur_ver]['handles'] += [handle_name]
-						print(echo_indent, end='')
-						print(f'Parsed `{line}` as handle definition: {handle_name}')
-					else:
-						is_struct = True
-						cur_struct = {}
-						cur_struct_name = line[len('typedef struct '):].split(' ', 1)[0]
-						all_struct_names |= {cur_struct_name}
-					continue
-				if line.startswith('typedef '):
-					if 'VKAPI_PTR' in line:
-						cur_func_name = line.split('VKAPI_PTR *', 1)[1].split(')', 1)[0]
-						if line.endswith('('):
-							is_typedef_func = True
-							params = {}
-						elif line.endswith(');'):
-							params = {}
-							for param in line.split(f'{cur_func_name})(', 1)[1].rsplit(')', 1)[0].split(','):
-								if param == 'void':
-									pass
-								elif ' ' in param:
-									type, name = param.rsplit(' ', 1)
-									params |= {name.strip(): type.strip()}
-								else:
-									params |= {f'_param_{params.len()}': type.strip()}
-						else:
-							print(echo_indent, end='')
-							print(f'Unknown data in function prototype at line {line_no}: {line}')
-							continue
-						cur_func = {
-							'ret_type': line[len('typedef '):].split('(', 1)[0].strip(),
-							'params': params,
-						}
-						if is_typedef_func == False:
-							ret[cur_ver]['func_protos'][cur_func_name] = cur_func.copy()
-							cur_func = {}
-					else:
-						if line.endswith(';'):
-							line = line[:-1]
-							type, name = line[len('typedef '):].rsplit(' ', 1)
-							ret[cur_ver]['typedefs'] |= {name: type}
-						else:
-							print(echo_indent, end='')
-							print(f'Unknown data in typedef at line {line_no}: {line}')
-					continue
-				if line.startswith('struct ') and line[-1] == ';':
-					identifier = line[len('struct '):-1]
-					if is_good_identifier(identifier):
-						print(echo_indent, end='')
-						print(f'Parsed `{line}` as handle definition: {identifier}')
-						ret[cur_ver]['handles'] += [identifier]
-					else:
-						print(echo_indent, end='')
-						print(f'Unknown struct at line {line_no}: {line}')
-					continue
-				if line.startswith('static const ') and line[-1] == ';':
-					type_ident, value = line[len('static const '):-1].split('=')
-					type_, ident = type_ident.strip().split(' ', 1)
-					value = value.strip()
-					ret[cur_ver]['typed_constants'][ident] = [value, type_]
-					all_const_values |= {ident: value}
-					continue
-				if line.startswith('VK_DEFINE_HANDLE'):
-					handle_name = line.split('(', 1)[1].split(')', 1)[0]
-					ret[cur_ver]['handles'] += [handle_name]
-					continue
-				if line.startswith('VK_DEFINE_NON_DISPATCHABLE_HANDLE'):
-					handle_name = line.split('(', 1)[1].split(')', 1)[0]
-					ret[cur_ver]['non_dispatchable_handles'] += [handle_name]
-					continue
-				print(echo_indent, end='')
-				print(f'Unknown line {line_no}: {line}')
+				verdata['non_dispatchable_handles'] += [decl.name]
+		elif kind is EnumDecl:
+			enum = verdata['enums'][decl.name] = Enum(decl.name, decl.values)
+			all_enum_names.add(decl.name)
+			for name in enum.values:
+				all_enum_values[name] = enum
+		elif kind is UnionDecl:
+			verdata['unions'][decl.name] = Union.from_json(decl.name, decl.members)
+		elif kind is StructDecl:
+			verdata['structs'][decl.name] = Struct.from_json(decl.name, decl.members)
+			all_struct_names.add(decl.name)
+		elif kind is FuncProtoDecl:
+			verdata['func_protos'][decl.name] = Command(decl.name, decl.ret_type, decl.params, decl.params.values())
+		elif kind is CommandDecl:
+			verdata['funcs'] += [decl.name]
 	ret['metadata'] = {
-		'all_enum_names': list(all_enum_names),
+		'all_enum_names': all_enum_names,
 		'all_enum_values': all_enum_values,
 		'all_const_values': all_const_values,
-		'all_struct_names': list(all_struct_names),
+		'all_struct_names': all_struct_names,
 		'must_alias': must_alias,
 	}
 	return ret
 
-def to_rust(outfile, parsed):
+def changed_items(after, before):
+	return {k: v for k, v in after.items() if k not in before or before[k] != v}
+
+include_pattern = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*"([^"]+)"', re.M)
+
+class ParseCache:
+	def __init__(self, cache_dir = '.vkparse_cache', max_size = 64 * 1024 * 1024):
+		self.cache_dir = cache_dir
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+		self.last_key = None
+		self.files = None
+		self.files_changed = False
+		with open(__file__, 'rb') as f:
+			self.parser_digest = hashlib.sha256(f.read()).hexdigest()
+
+	def file_entry(self, path):
+		if self.files is None:
+			try:
+				with open(os.path.join(self.cache_dir, 'files.digests'), 'rb') as f:
+					self.files = pickle.load(f)
+			except (OSError, EOFError, pickle.UnpicklingError):
+				self.files = {}
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return b'<missing>', []
+		entry = self.files.get(path)
+		if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+			with open(path, 'rb') as f:
+				data = f.read()
+			includes = []
+			for include_file in include_pattern.findall(data):
+				include_file = include_file.decode('utf-8', 'replace')
+				if os.path.basename(include_file) != 'vk_platform.h':
+					includes += [resolve_include(path, include_file)]
+			entry = self.files[path] = (stat.st_mtime_ns, stat.st_size, hashlib.sha256(data).digest(), includes)
+			self.files_changed = True
+		return entry[2:]
+
+	def hash_include_graph(self, h, input, seen):
+		input = os.path.normpath(input)
+		if input in seen:
+			return
+		seen.add(input)
+		digest, includes = self.file_entry(input)
+		h.update(f'\\0file:{input}:'.encode())
+		h.update(digest)
+		for include_file in includes:
+			self.hash_include_graph(h, include_file, seen)
+
+	def key(self, input, initial, is_include_header, handles, typedefs, aliases, structs, feature_name, base_key = None, included = None):
+		h = hashlib.sha256()
+		h.update(self.parser_digest.encode())
+		self.hash_include_graph(h, input, set())
+		if self.files_changed:
+			self.write_pickle(os.path.join(self.cache_dir, 'files.digests'), self.files)
+			self.files_changed = False
+		h.update(repr((is_include_header, handles, typedefs, aliases, structs, feature_name, sorted(included or ()))).encode())
+		if initial is not None:
+			if base_key is not None:
+				h.update(base_key.encode())
+			else:
+				h.update(repr(list(initial.keys())).encode())
+				metadata = initial.get('metadata')
+				h.update(json.dumps(None if metadata is None else metadata_to_json(metadata), sort_keys = True).encode())
+		return h.hexdigest()
+
+	def path_of(self, key):
+		return os.path.join(self.cache_dir, f'{key}.pickle')
+
+	def load(self, key):
+		path = self.path_of(key)
+		try:
+			with open(path, 'rb') as f:
+				delta = pickle.load(f)
+		except (OSError, EOFError, pickle.UnpicklingError):
+			return None
+		os.utime(path)
+		return delta
+
+	def write_pickle(self, path, obj):
+		os.makedirs(self.cache_dir, exist_ok = True)
+		temp_path = f'{path}.{os.getpid()}.tmp'
+		with open(temp_path, 'wb') as f:
+			pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+		os.replace(temp_path, path)
+
+	def store(self, key, delta):
+		self.write_pickle(self.path_of(key), delta)
+		self.evict()
+
+	def evict(self):
+		entries = []
+		total_size = 0
+		for entry in os.scandir(self.cache_dir):
+			if not entry.name.endswith('.pickle'):
+				continue
+			stat = entry.stat()
+			entries += [(stat.st_mtime, stat.st_size, entry.path)]
+			total_size += stat.st_size
+		entries.sort()
+		while total_size > self.max_size and len(entries) > 1:
+			mtime, size, path = entries.pop(0)
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			total_size -= size
+
+	def parse(self, input, initial, is_include_header, handles, typedefs, aliases, structs, feature_name, base_key = None, included = None):
+		key = self.last_key = self.key(input, initial, is_include_header, handles, typedefs, aliases, structs, feature_name, base_key, included)
+		delta = self.load(key)
+		if delta is not None:
+			self.hits += 1
+			replay_log(delta['log'])
+			if included is not None:
+				included.update(delta['included'])
+			return self.apply(initial, delta)
+		self.misses += 1
+		before = {}
+		before_enum_names = set()
+		before_enum_values = {}
+		before_const_values = {}
+		before_struct_names = set()
+		if initial is not None:
+			before = dict(initial)
+			if 'metadata' in initial:
+				before_enum_names = set(initial['metadata']['all_enum_names'])
+				before_enum_values = dict(initial['metadata']['all_enum_values'])
+				before_const_values = dict(initial['metadata']['all_const_values'])
+				before_struct_names = set(initial['metadata']['all_struct_names'])
+		before_included = set() if included is None else set(included)
+		scanned = set(before_included)
+		with capture_log() as records:
+			ret = parse(input, initial, is_include_header, handles, typedefs, aliases, structs, feature_name, included = scanned)
+		replay_log(records)
+		if included is not None:
+			included.update(scanned)
+		metadata = ret['metadata']
+		delta = {
+			'order': list(ret.keys()),
+			'versions': {k: v for k, v in ret.items() if k != 'metadata' and before.get(k) is not v},
+			'all_enum_names': metadata['all_enum_names'] - before_enum_names,
+			'all_enum_values': changed_items(metadata['all_enum_values'], before_enum_values),
+			'all_const_values': changed_items(metadata['all_const_values'], before_const_values),
+			'all_struct_names': metadata['all_struct_names'] - before_struct_names,
+			'must_alias': metadata['must_alias'],
+			'included': sorted(scanned - before_included),
+			'log': records,
+		}
+		self.store(key, delta)
+		return ret
+
+	def apply(self, initial, delta):
+		ret = {} if initial is None else initial
+		try:
+			metadata = ret['metadata']
+			all_enum_names = metadata['all_enum_names']
+			all_enum_values = metadata['all_enum_values']
+			all_const_values = metadata['all_const_values']
+			all_struct_names = metadata['all_struct_names']
+		except KeyError:
+			all_enum_names = set()
+			all_enum_values = {}
+			all_const_values = {}
+			all_struct_names = set()
+		all_enum_names |= delta['all_enum_names']
+		all_enum_values |= delta['all_enum_values']
+		all_const_values |= delta['all_const_values']
+		all_struct_names |= delta['all_struct_names']
+		versions = delta['versions']
+		ordered = {}
+		for k in delta['order']:
+			if k == 'metadata':
+				ordered[k] = {
+					'all_enum_names': all_enum_names,
+					'all_enum_values': all_enum_values,
+					'all_const_values': all_const_values,
+					'all_struct_names': all_struct_names,
+					'must_alias': delta['must_alias'],
+				}
+			elif k in versions:
+				ordered[k] = versions[k]
+			else:
+				ordered[k] = ret[k]
+		ret.clear()
+		ret |= ordered
+		return ret
+
+def parse_header_job(job):
+	input, metadata, kwargs = job
+	included = kwargs['included'] = set(kwargs['included'])
+	initial = {'metadata': {
+		'all_enum_names': set(metadata['all_enum_names']),
+		'all_enum_values': dict(metadata['all_enum_values']),
+		'all_const_values': dict(metadata['all_const_values']),
+		'all_struct_names': set(metadata['all_struct_names']),
+		'must_alias': dict(metadata['must_alias']),
+	}}
+	start = time.perf_counter()
+	start_blocks = sys.getallocatedblocks()
+	with capture_log() as records, collect_counters() as counters:
+		parsed = parse(input, initial, 1, **kwargs)
+	elapsed = time.perf_counter() - start
+	blocks = sys.getallocatedblocks() - start_blocks
+	result = parsed.pop('metadata')
+	return {
+		'versions': parsed,
+		'all_enum_names': result['all_enum_names'] - metadata['all_enum_names'],
+		'all_enum_values': changed_items(result['all_enum_values'], metadata['all_enum_values']),
+		'all_const_values': changed_items(result['all_const_values'], metadata['all_const_values']),
+		'all_struct_names': result['all_struct_names'] - metadata['all_struct_names'],
+		'included': included,
+		'log': records,
+		'time': elapsed,
+		'blocks': blocks,
+		'counters': counters,
+	}
+
+def parse_headers(parsed, headers, jobs = 1, cache = None, timer = None, base_key = None, included = None):
+	metadata = parsed['metadata']
+	if included is None:
+		included = set()
+	tasks = [(input, metadata, kwargs | {'cache': cache, 'base_key': base_key, 'included': included}) for input, kwargs in headers]
+	start = time.perf_counter()
+	if jobs > 1 and len(tasks) > 1:
+		with ProcessPoolExecutor(min(jobs, len(tasks))) as pool:
+			results = list(pool.map(parse_header_job, tasks))
+	else:
+		results = [parse_header_job(task) for task in tasks]
+	wall_time = time.perf_counter() - start
+	for (input, kwargs), result in zip(headers, results):
+		replay_log(result['log'])
+		parsed |= result['versions']
+		metadata['all_enum_names'] |= result['all_enum_names']
+		metadata['all_enum_values'] |= result['all_enum_values']
+		metadata['all_const_values'] |= result['all_const_values']
+		metadata['all_struct_names'] |= result['all_struct_names']
+		metadata['must_alias'] = c_type_aliases | kwargs.get('aliases', {}) | metadata['must_alias']
+		included.update(result['included'])
+		current_counters.get().update(result['counters'])
+		if timer is not None:
+			timer.add(f'parse:{input}', result['time'], result['blocks'])
+	timings = {input: result['time'] for (input, kwargs), result in zip(headers, results)}
+	return parsed, timings, wall_time
+
+class StageTimer:
+	def __init__(self):
+		self.timings = {}
+		self.allocations = {}
+
+	def add(self, name, elapsed, blocks = 0):
+		self.timings[name] = self.timings.get(name, 0.0) + elapsed
+		self.allocations[name] = self.allocations.get(name, 0) + blocks
+
+	def begin(self):
+		return time.perf_counter(), sys.getallocatedblocks()
+
+	def end(self, name, begin):
+		start, start_blocks = begin
+		self.add(name, time.perf_counter() - start, sys.getallocatedblocks() - start_blocks)
+
+	@contextmanager
+	def stage(self, name):
+		begin = self.begin()
+		try:
+			yield
+		finally:
+			self.end(name, begin)
+
+	def report(self):
+		return {name: {'time': elapsed, 'allocated_blocks': self.allocations[name]} for name, elapsed in self.timings.items()}
+
+identifier_pattern = re.compile(r'[A-Za-z_]\w*')
+
+def constant_resolver(all_const_values, all_enum_values, table, warn = True):
+	visiting = set()
+	def resolve(name):
+		try:
+			return table[name]
+		except KeyError:
+			pass
+		try:
+			expr = all_const_values[name]
+		except KeyError:
+			expr = all_enum_values[name].values[name]
+		if name in visiting:
+			raise ValueError(f'Can not evaluate `{name}`: it refers to itself')
+		visiting.add(name)
+		try:
+			value, type = evaluator.evaluate(expr)
+		except ValueError as e:
+			if warn:
+				current_counters.get()['unknown_constant_expression'] += 1
+				log, level = log_events['unknown_constant_expression']
+				log_message(log, level, f'Constant `{name}` is kept as `{expr}`. {e}', {})
+			ret = table[name] = None, None, expr
+			return ret
+		finally:
+			visiting.discard(name)
+		if constant_literal_pattern.fullmatch(expr):
+			literal = expr
+		elif identifier_pattern.fullmatch(expr):
+			literal = table[expr][2]
+		else:
+			literal = None
+		ret = table[name] = value, type, literal
+		return ret
+	def resolve_value(name):
+		value, type, literal = resolve(name)
+		if value is None:
+			raise ValueError(f'Can not evaluate `{name}`: it has no value')
+		return value, type
+	evaluator = ConstantEvaluator(resolve_value)
+	return resolve
+
+def evaluate_constants(parsed):
+	metadata = parsed['metadata']
+	all_const_values = metadata['all_const_values']
+	all_enum_values = metadata['all_enum_values']
+	table = {}
+	resolve = constant_resolver(all_const_values, all_enum_values, table)
+	for name in all_const_values:
+		resolve(name)
+	for name in all_enum_values:
+		resolve(name)
+	for version, verdata in parsed.items():
+		if version != 'metadata':
+			for name, constant in verdata['typed_constants'].items():
+				value, _, literal = table[name]
+				table[name] = value, constant.type, literal
+	for name, enum in all_enum_values.items():
+		value, _, literal = table[name]
+		table[name] = value, enum.name, literal
+	return table
+
+Symbol = namedtuple('Symbol', 'kind version')
+
+class SymbolIndex:
+	def __init__(self, parsed):
+		metadata = parsed['metadata']
+		self.all_const_values = metadata['all_const_values']
+		self.all_enum_values = metadata['all_enum_values']
+		try:
+			self.resolved_constants = metadata['resolved_constants']
+		except KeyError:
+			self.resolved_constants = evaluate_constants(parsed)
+		self.parsed = parsed
+		self.symbols = None
+		self.deps = None
+		self.flags_to_bits = {}
+		self.bits_to_flags = {}
+		self.snake_names = {}
+		self.camel_names = {}
+		self.version_names = {}
+		for version, verdata in parsed.items():
+			if version != 'metadata':
+				self.add_version(version, verdata)
+
+	def lookup(self, name):
+		if self.symbols is None:
+			symbols = {}
+			for version, verdata in reversed(self.parsed.items()):
+				if version == 'metadata':
+					continue
+				for kind in ('constants', 'typed_constants', 'typedefs', 'handles', 'non_dispatchable_handles', 'enums', 'unions', 'structs', 'func_protos', 'funcs'):
+					symbols |= dict.fromkeys(verdata[kind], Symbol(kind, version))
+				enum_value = Symbol('enum_values', version)
+				for enum in verdata['enums'].values():
+					symbols |= dict.fromkeys(enum.values, enum_value)
+			self.symbols = symbols
+		return self.symbols.get(name)
+
+	def dependencies(self, name):
+		if self.deps is None:
+			deps = {}
+			for version, verdata in self.parsed.items():
+				if version == 'metadata':
+					continue
+				for kind in ('constants', 'typed_constants', 'typedefs', 'enums', 'unions', 'structs', 'func_protos'):
+					for item, value in verdata[kind].items():
+						deps[item] = set(identifier_pattern.findall(json.dumps(value, default = json_default)))
+				for handle in verdata['handles'] + verdata['non_dispatchable_handles']:
+					deps[handle] = set()
+				for func in verdata['funcs']:
+					deps[func] = {f'PFN_{func}'}
+				for enum, item in verdata['enums'].items():
+					for value in item.values:
+						deps.setdefault(value, {enum})
+				for flags, (enum, values) in self.flags_to_bits[version].items():
+					if flags in deps:
+						deps[flags].add(enum)
+			self.deps = deps
+		return self.deps.get(name, ())
+
+	def add_version(self, version, verdata):
+		enums = verdata['enums']
+		typedefs = verdata['typedefs']
+		flags_to_bits = {}
+		bits_to_flags = {}
+		for enum, item in enums.items():
+			values = item.values
+			prefix = enum.rstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+			suffix = enum[len(prefix):]
+			if prefix.endswith('Bits') and len(prefix) > len('Bits'):
+				typename = prefix[:-len('Bits')]
+				flags_to_bits[f'{typename}s{suffix}'] = enum, values
+				if not typename[-1].isupper() and typename[-1] != 's':
+					flags_to_bits[f'{typename}{suffix}'] = enum, values
+			try:
+				typename, suffix = enum.rsplit('Bits', 1)
+			except ValueError:
+				continue
+			typename += 's'
+			if typename in typedefs:
+				bits_to_flags[enum] = typename, suffix
+		self.flags_to_bits[version] = flags_to_bits
+		self.bits_to_flags[version] = bits_to_flags
+		for type in typedefs:
+			if type in flags_to_bits:
+				self.snake_names[type] = to_snake(type)
+		for func in verdata['funcs']:
+			self.snake_names[func] = to_snake(func)
+		if 'VkResult' in enums:
+			for name in enums['VkResult'].values:
+				self.camel_names[name] = to_camel(name, True)
+		self.version_names[version] = to_snake(version), to_camel(f'VULKAN_{version.split("_", 1)[-1]}'.lower(), True)
+
+	def snake(self, name):
+		try:
+			return self.snake_names[name]
+		except KeyError:
+			ret = self.snake_names[name] = to_snake(name)
+			return ret
+
+	def camel(self, name):
+		try:
+			return self.camel_names[name]
+		except KeyError:
+			ret = self.camel_names[name] = to_camel(name, True)
+			return ret
+
+def version_dependencies(verdata, index):
+	deps = set()
+	for name in set(identifier_pattern.findall(json.dumps(verdata, default = json_default))):
+		symbol = index.lookup(name)
+		if symbol is not None:
+			deps.add(symbol.version)
+	return deps
+
+def select_versions(parsed, include = (), exclude = (), index = None):
+	if index is None:
+		index = SymbolIndex(parsed)
+	matched = {version for version in parsed if version != 'metadata'
+		and (not include or any(fnmatchcase(version, pattern) for pattern in include))
+		and not any(fnmatchcase(version, pattern) for pattern in exclude)}
+	selected = matched | {'VK_VERSION_1_0'}
+	pending = list(selected)
+	while pending:
+		for dep in version_dependencies(parsed[pending.pop()], index):
+			if dep not in selected:
+				selected.add(dep)
+				pending += [dep]
+	required = [version for version in parsed if version in selected and version not in matched]
+	return {version: verdata for version, verdata in parsed.items() if version in selected or version == 'metadata'}, required
+
+core_commands = ('vkCreateInstance', 'vkDestroyInstance', 'vkEnumerateInstanceExtensionProperties', 'vkGetInstanceProcAddr', 'vkGetDeviceProcAddr')
+kept_constant_pattern = re.compile(r'VK_API_VERSION_\d+_\d+|\w+_(?:SPEC_VERSION|EXTENSION_NAME)')
+
+def shake_versions(parsed, commands, index = None):
+	if index is None:
+		index = SymbolIndex(parsed)
+	kept = set()
+	pending = list(core_commands) + list(commands)
+	while pending:
+		name = pending.pop()
+		if name not in kept:
+			kept.add(name)
+			pending += index.dependencies(name)
+	ret = {}
+	for version, verdata in parsed.items():
+		if version == 'metadata':
+			ret[version] = verdata
+			continue
+		shaken = {}
+		for kind, items in verdata.items():
+			if isinstance(items, dict):
+				shaken[kind] = {name: value for name, value in items.items() if name in kept}
+			elif isinstance(items, list):
+				shaken[kind] = [name for name in items if name in kept]
+			else:
+				shaken[kind] = items
+		if version == 'VK_VERSION_1_0' or any(count_items(shaken).values()):
+			shaken['constants'] = {name: value for name, value in verdata['constants'].items() if name in kept or kept_constant_pattern.fullmatch(name)}
+			ret[version] = shaken
+	return ret
+
+class Parts(list):
+	write = list.append
+	def getvalue(self):
+		return ''.join(self)
+
+def rust_reference(name):
+	if name.startswith('StdVideo'):
+		return ''
+	return f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{name}.html>\n'
+
+def rust_literal(value, hex = False):
+	if isinstance(value, str):
+		return f'"{value}"'
+	if isinstance(value, float):
+		return repr(value)
+	return f'{value:#x}' if hex else str(value)
+
+def rust_constant_type(value, type):
+	if type == 'const char*':
+		return '&str'
+	if type == 'int32_t' and value >= 0:
+		return 'u32'
+	return c_type_aliases[type]
+
+rust_literal_suffixes = (('ull', 'u64'), ('ll', 'i64'), ('u', 'u32'), ('l', 'i32'))
+
+def rust_constant(value, type, literal):
+	if literal is None:
+		return rust_literal(value, type in constant_int_types and value > 0xffff), rust_constant_type(value, type)
+	if len(literal) >= 2 and f'{literal[0]}{literal[-1]}' == '""':
+		return literal, '&str'
+	if constant_literal_pattern.fullmatch(literal):
+		literal = literal.lower()
+	rust_type = 'u32'
+	for suffix, suffix_type in rust_literal_suffixes:
+		if literal.endswith(suffix):
+			literal, rust_type = f'{literal[:-len(suffix)]}{suffix_type}', suffix_type
+			break
+	else:
+		if literal.endswith('f') and '.' in literal:
+			literal, rust_type = f'{literal[:-1]}f32', 'f32'
+	if literal[0] == '~':
+		literal = f'!{literal[1:]}'
+	return literal, rust_type
+
+def rust_debug_impl(name, fields, feature = ''):
+	return (f'{feature}impl Debug for {name} {{\n'
+		'\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n'
+		f'\t\tf.debug_struct("{name}")\n'
+		f'{"".join(fields)}'
+		'\t\t.finish()\n'
+		'\t}\n'
+		'}\n')
+
+def rust_flags_display(type, snake_type, enum, bits, feature = ''):
+	names = ''.join(f'\t\t({enum}::{bit} as {type}, "{enum}::{bit}"),\n' for bit in bits)
+	return (f'/// Wrap `{type}` to show the composition of the bits from the member of `{enum}` when it is formatted, without allocating\n'
+		f'{feature}pub fn {snake_type}_display(value: {type}) -> VkFlagsDisplay<{type}> {{\n'
+		f'\tconst NAMES: &[({type}, &str)] = &[\n'
+		f'{names}'
+		'\t];\n'
+		'\tVkFlagsDisplay {value, names: NAMES}\n'
+		'}\n'
+		f'/// Convert `{type}` to `String`, showing the composition of the bits from the member of `{enum}`\n'
+		f'{feature}pub fn {snake_type}_to_string(value: {type}) -> String {{\n'
+		f'\t{snake_type}_display(value).to_string()\n'
+		'}\n')
+
+def rust_bitflag_impls(enum, typename):
+	return (f'impl BitAnd for {enum} {{\n\ttype Output = {typename};\n\tfn bitand(self, rhs: Self) -> {typename} {{\n\t\tself as {typename} & rhs as {typename}\n\t}}\n}}\n'
+		f'impl BitAnd<{typename}> for {enum} {{\n\ttype Output = {typename};\n\tfn bitand(self, rhs: {typename}) -> {typename} {{\n\t\tself as {typename} & rhs\n\t}}\n}}\n'
+		f'impl BitOr for {enum} {{\n\ttype Output = {typename};\n\tfn bitor(self, rhs: Self) -> {typename} {{\n\t\tself as {typename} | rhs as {typename}\n\t}}\n}}\n'
+		f'impl BitOr<{typename}> for {enum} {{\n\ttype Output = {typename};\n\tfn bitor(self, rhs: {typename}) -> {typename} {{\n\t\tself as {typename} | rhs\n\t}}\n}}\n'
+		f'impl BitXor for {enum} {{\n\ttype Output = {typename};\n\tfn bitxor(self, rhs: Self) -> {typename} {{\n\t\tself as {typename} ^ rhs as {typename}\n\t}}\n}}\n'
+		f'impl BitXor<{typename}> for {enum} {{\n\ttype Output = {typename};\n\tfn bitxor(self, rhs: {typename}) -> {typename} {{\n\t\tself as {typename} ^ rhs\n\t}}\n}}\n'
+		f'impl Not for {enum} {{\n\ttype Output = {typename};\n\tfn not(self) -> {typename} {{\n\t\t!(self as {typename})\n\t}}\n}}\n')
+
+def rust_bitflag_methods(typename):
+	return ('\t/// Combine bits together\n'
+		f'\tpub fn combine(bits: &[Self]) -> {typename} {{\n'
+		'\t\tlet mut ret = 0;\n'
+		'\t\tfor bit in bits {\n'
+		f'\t\t\tret |= *bit as {typename};\n'
+		'\t\t}\n'
+		'\t\tret\n'
+		'\t}\n'
+		'\t/// Check if the bitfield has a value\n'
+		f'\tpub fn check(value: {typename}, bits: Self) -> bool {{\n'
+		'\t\t(bits & value) == value\n'
+		'\t}\n')
+
+def rust_bitfield_accessors(name, bf_name, bits, shift):
+	mask = hex((1 << bits) - 1)
+	if shift:
+		get = f'(self.{bf_name} >> {shift}) & {mask}'
+		set = f'self.{bf_name} = (value & {mask}) << {shift};'
+	else:
+		get = f'self.{bf_name} & {mask}'
+		set = f'self.{bf_name} = value & {mask};'
+	return (f'\tpub fn get_{name}(&self) -> u32 {{\n\t\t{get}\n\t}}\n'
+		f'\tpub fn set_{name}(&mut self, value: u32) {{\n\t\t{set}\n\t}}\n')
+
+def rust_call(func, ret_type, proc, args):
+	if ret_type == 'VkResult':
+		catch = f'vk_convert_result("{func}", catch_unwind(||(({proc})({args}))))'
+		call = f'vk_result_conv("{func}", ({proc})({args}))'
+	elif ret_type == 'void':
+		catch = f'vk_process_catch(catch_unwind(||(({proc})({args}))))'
+		call = f'{{({proc})({args}); Ok(())}}'
+	else:
+		catch = f'vk_process_catch(catch_unwind(||(({proc})({args}))))'
+		call = f'Ok(({proc})({args}))'
+	return ('\t\t#[cfg(feature = "check_nullptr")]\n'
+		f'\t\tif {proc} == dummy_{func} {{return Err(VkError::NullFunctionPointer("{func}"));}}\n'
+		'\t\t#[cfg(feature = "catch_nullptr")]\n'
+		f'\t\treturn {catch};\n'
+		'\t\t#[cfg(not(feature = "catch_nullptr"))]\n'
+		f'\t\treturn {call};\n'
+		'\t}\n')
+
+device_root_handles = ('VkDevice', 'VkQueue', 'VkCommandBuffer')
+
+def device_level_handles(parsed):
+	protos = [proto.param_types for version, verdata in parsed.items() if version != 'metadata' for proto in verdata['func_protos'].values() if proto.param_types]
+	dispatchable = {param_types[0] for param_types in protos}
+	dispatchable &= {handle for version, verdata in parsed.items() if version != 'metadata' for handle in verdata['handles']}
+	handles = set(device_root_handles)
+	added = True
+	while added:
+		added = False
+		for param_types in protos:
+			types = iter(param_types)
+			if next(types) not in handles:
+				continue
+			for type in types:
+				handle = type.removesuffix('*')
+				if handle != type and handle in dispatchable and handle not in handles:
+					handles.add(handle)
+					added = True
+	return handles
+
+def rust_version_emitter(parsed, index = None, timer = None, modules = False, lazy = False):
+	stage = timer.stage if timer is not None else lambda name: nullcontext()
+	crate_vis = 'pub(crate) ' if modules else ''
+	if index is None:
+		index = SymbolIndex(parsed)
+	resolved_constants = index.resolved_constants
+	snake = index.snake
 	metadata = parsed['metadata']
-	all_enum_names = set(metadata['all_enum_names'])
+	all_enum_names = metadata['all_enum_names']
 	all_enum_values = metadata['all_enum_values']
 	all_const_values = metadata['all_const_values']
-	all_struct_names = set(metadata['all_struct_names'])
+	all_struct_names = metadata['all_struct_names']
 	must_alias = metadata['must_alias']
+	device_handles = device_level_handles(parsed)
+	@lru_cache(maxsize = None)
 	def ctype_to_rust(ctype):
 		ctype = ctype.replace(' *', '*')
 		try:
@@ -477,6 +1516,7 @@ def to_rust(outfile, parsed):
 				rust = f'{rust.strip()} {ctype}'.strip()
 				break
 		return rust
+	@lru_cache(maxsize = None)
 	def process_guts(name, type, is_param = False):
 		is_array = False
 		type = ctype_to_rust(type)
@@ -493,41 +1533,6 @@ def to_rust(outfile, parsed):
 		if is_param and is_array: type = f'&{type}'
 		if name == 'type': name = f'{name}_'
 		return name, type
-	def process_constant_value(value):
-		while True:
-			try:
-				value = all_const_values[value]
-			except KeyError:
-				break
-		while True:
-			try:
-				value, source = all_enum_values[value]
-			except KeyError:
-				break
-		type_ = None
-		value = value.lower()
-		if f'{value[0]}{value[-1]}' == '""' and len(value) >= 2:
-			type_ = '&str'
-		elif value.endswith('ull'):
-			type_ = 'u64'
-			value = f'{value[:-3]}u64'
-		elif value.endswith('ll'):
-			type_ = 'i64'
-			value = f'{value[:-2]}i64'
-		elif value.endswith('u'):
-			type_ = 'u32'
-			value = f'{value[:-1]}u32'
-		elif value.endswith('l'):
-			type_ = 'i32'
-			value = f'{value[:-1]}i32'
-		elif value.endswith('f') and '.' in value:
-			type_ = 'f32'
-			value = f'{value[:-1]}f32'
-		if value[0] == '~':
-			value = f'!{value[1:]}'
-		if type_ is None:
-			type_ = 'u32'
-		return value, type_
 	def union_member_type_process(union, type):
 		is_enum = type in all_enum_names
 		if is_enum:
@@ -552,97 +1557,15 @@ def to_rust(outfile, parsed):
 		except KeyError:
 			pass
 		return type
-	vk_struct = io.StringIO()
-	vk_traits = io.StringIO()
-	vk_s_impl = io.StringIO()
-	vk_g_impl = io.StringIO()
-	vk_struct.write('/// The all-in-one struct for your Vulkan APIs\n')
-	vk_struct.write('#[derive(Default, Clone, Debug)]\n')
-	vk_struct.write('pub struct VkCore {\n')
-	vk_struct.write('\t/// The Vulkan instance\n')
-	vk_struct.write(f'\tinstance: Arc<VkInstanceWrap>,\n')
-	vk_struct.write('\t/// The Vulkan extension strings\n')
-	vk_struct.write(f'\textensions: BTreeSet<String>,\n')
-	vk_struct.write('\t/// The application info\n')
-	vk_struct.write(f'\tapp_info: VkApplicationInfo,\n')
-	vk_s_impl.write('\n')
-	vk_s_impl.write('impl Default for VkApplicationInfo {\n')
-	vk_s_impl.write('\tfn default() -> Self {\n')
-	vk_s_impl.write('\t\tlet app_name = CString::new("<APPLICATION NAME>").unwrap();\n')
-	vk_s_impl.write('\t\tlet engine_name = CString::new("<ENGINE_NAME>").unwrap();\n')
-	vk_s_impl.write('\t\tSelf {\n')
-	vk_s_impl.write('\t\t\tsType: VkStructureType::VK_STRUCTURE_TYPE_APPLICATION_INFO,\n')
-	vk_s_impl.write('\t\t\tpNext: null(),\n')
-	vk_s_impl.write('\t\t\tpApplicationName: app_name.as_ptr(),\n')
-	vk_s_impl.write('\t\t\tapplicationVersion: vk_make_version(1, 0, 0),\n')
-	vk_s_impl.write('\t\t\tpEngineName: engine_name.as_ptr(),\n')
-	vk_s_impl.write('\t\t\tengineVersion: vk_make_version(1, 0, 0),\n')
-	vk_s_impl.write('\t\t\tapiVersion: VK_API_VERSION_1_4,\n')
-	vk_s_impl.write('\t\t}\n')
-	vk_s_impl.write('\t}\n')
-	vk_s_impl.write('}\n')
-	vk_s_impl.write('\n')
-	vk_s_impl.write('#[derive(Default, Debug, Clone, Copy)]\n')
-	vk_s_impl.write('pub struct VkInstanceWrap(VkInstance);\n')
-	vk_s_impl.write('\n')
-	vk_s_impl.write('unsafe impl Send for VkInstanceWrap {}\n')
-	vk_s_impl.write('unsafe impl Sync for VkInstanceWrap {}\n')
-	vk_s_impl.write('\n')
-	vk_s_impl.write('impl Deref for VkInstanceWrap {\n')
-	vk_s_impl.write('\ttype Target = VkInstance;\n')
-	vk_s_impl.write('\tfn deref(&self) -> &Self::Target {\n')
-	vk_s_impl.write('\t\t&self.0\n')
-	vk_s_impl.write('\t}\n')
-	vk_s_impl.write('}\n')
-	vk_s_impl.write('\n')
-	vk_s_impl.write('impl VkCore {\n')
-	vk_s_impl.write('\t/// Create the all-in-one struct for your Vulkan APIs by a `get_instance_proc_address()` function\n')
-	vk_s_impl.write('\t/// You have to provide the `VkApplicationInfo` struct to specify your application info\n')
-	vk_s_impl.write('\t/// You can use `vk_make_version()`/`vk_make_api_version()` from this crate\n')
-	vk_s_impl.write("\tpub fn new(app_info: VkApplicationInfo, mut get_instance_proc_address: impl FnMut(VkInstance, &'static str) -> *const c_void) -> Result<Self> {\n")
-	vk_s_impl.write('\t\tlet vkEnumerateInstanceExtensionProperties = get_instance_proc_address(null(), "vkEnumerateInstanceExtensionProperties");\n')
-	vk_s_impl.write('\t\tif vkEnumerateInstanceExtensionProperties.is_null() {\n')
-	vk_s_impl.write('\t\t\treturn Err(VkError::NullFunctionPointer("vkEnumerateInstanceExtensionProperties"));\n')
-	vk_s_impl.write('\t\t}\n')
-	vk_s_impl.write('\t\tlet vkEnumerateInstanceExtensionProperties: PFN_vkEnumerateInstanceExtensionProperties = unsafe{transmute(vkEnumerateInstanceExtensionProperties)};\n')
-	vk_s_impl.write('\t\tlet mut ext_count: u32 = 0;\n')
-	vk_s_impl.write('\t\tvk_result_conv("vkEnumerateInstanceExtensionProperties", vkEnumerateInstanceExtensionProperties(null(), &mut ext_count, null_mut()))?;\n')
-	vk_s_impl.write('\t\tlet mut extensions: Vec<VkExtensionProperties> = Vec::with_capacity(ext_count as usize);\n')
-	vk_s_impl.write('\t\tvk_result_conv("vkEnumerateInstanceExtensionProperties", vkEnumerateInstanceExtensionProperties(null(), &mut ext_count, extensions.as_mut_ptr()))?;\n')
-	vk_s_impl.write('\t\tunsafe {extensions.set_len(ext_count as usize)};\n')
-	vk_s_impl.write('\t\tlet ext_pointers: Vec<*const i8> = extensions.iter().map(|prop|prop.extensionName.as_ptr()).collect();\n')
-	vk_s_impl.write('\t\tlet extension_strings: Vec<String> = ext_pointers.iter().map(|p|unsafe {CStr::from_ptr(*p)}.to_string_lossy().to_string()).collect();\n')
-	vk_s_impl.write('\t\t#[allow(unused_mut)]\n')
-	vk_s_impl.write("\t\tlet mut layers: Vec<&'static str> = Vec::new();\n")
-	vk_s_impl.write('\t\t#[cfg(feature = "validation_layer")]\n')
-	vk_s_impl.write('\t\tlayers.push("VK_LAYER_KHRONOS_validation\\0");\n')
-	vk_s_impl.write('\t\t#[cfg(feature = "api_dump")]\n')
-	vk_s_impl.write('\t\tlayers.push("VK_LAYER_LUNARG_api_dump\\0");\n')
-	vk_s_impl.write('\t\tlet layer_ptrs: Vec<*const i8> = layers.iter().map(|l|l.as_ptr() as *const i8).collect();\n')
-	vk_s_impl.write('\t\tlet create_info = VkInstanceCreateInfo {\n')
-	vk_s_impl.write('\t\t\tsType: VkStructureType::VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO,\n')
-	vk_s_impl.write('\t\t\tpNext: null(),\n')
-	vk_s_impl.write('\t\t\tflags: 0,\n')
-	vk_s_impl.write('\t\t\tenabledLayerCount: layer_ptrs.len() as u32,\n')
-	vk_s_impl.write('\t\t\tpApplicationInfo: &app_info,\n')
-	vk_s_impl.write('\t\t\tppEnabledLayerNames: layer_ptrs.as_ptr(),\n')
-	vk_s_impl.write('\t\t\tenabledExtensionCount: ext_pointers.len() as u32,\n')
-	vk_s_impl.write('\t\t\tppEnabledExtensionNames: ext_pointers.as_ptr()\n')
-	vk_s_impl.write('\t\t};\n')
-	vk_s_impl.write('\t\tlet vkCreateInstance = get_instance_proc_address(null(), "vkCreateInstance");\n')
-	vk_s_impl.write('\t\tif vkCreateInstance.is_null() {\n')
-	vk_s_impl.write('\t\t\treturn Err(VkError::NullFunctionPointer("vkCreateInstance"))\n')
-	vk_s_impl.write('\t\t}\n')
-	vk_s_impl.write('\t\tlet vkCreateInstance: PFN_vkCreateInstance = unsafe{transmute(vkCreateInstance)};\n')
-	vk_s_impl.write('\t\tlet mut instance: VkInstance = null();\n')
-	vk_s_impl.write('\t\tvk_result_conv("vkCreateInstance", vkCreateInstance(&create_info, null(), &mut instance))?;\n')
-	vk_s_impl.write('\t\t\n')
-	vk_s_impl.write('\t\tOk(Self {\n')
-	vk_s_impl.write('\t\t\tinstance: Arc::new(VkInstanceWrap(instance)),\n')
-	vk_s_impl.write('\t\t\textensions: extension_strings.into_iter().collect(),\n')
-	vk_s_impl.write('\t\t\tapp_info,\n')
-	def process_version(version, verdata, f):
-		nonlocal vk_struct, vk_traits, vk_s_impl, vk_g_impl
+	def process_version(version, verdata):
+		f = Parts()
+		vk_struct = Parts()
+		vk_traits = Parts()
+		vk_s_impl = Parts()
+		vk_g_impl = Parts()
+		dev_struct = Parts()
+		dev_s_impl = Parts()
+		dev_impl = Parts()
 		constants = verdata['constants']
 		typed_constants = verdata['typed_constants']
 		typedefs = verdata['typedefs']
@@ -664,648 +1587,864 @@ def to_rust(outfile, parsed):
 			feature = ''
 			feature_indent = ''
 			feature_indent_3 = ''
+		flags_to_bits = index.flags_to_bits[version]
+		bits_to_flags = index.bits_to_flags[version]
 		def is_bitfield_enum(typename):
-			nonlocal enums
-			suffix = ''
-			while typename[-1].isupper():
-				suffix = typename[-1] + suffix
-				typename = typename[:-1]
-				if len(typename) == 0:
-					return None, None
-			if typename[-1] == 's':
-				typename = typename[:-1]
-			enumbf_type = f'{typename}Bits{suffix}'
-			try:
-				enumbf_data = enums[enumbf_type]
-			except KeyError:
-				enumbf_type = None
-				enumbf_data = None
-			return enumbf_type, enumbf_data
+			return flags_to_bits.get(typename, (None, None))
 		def is_the_enum_bitfield(enumname):
-			try:
-				typename, suffix = enumname.rsplit("Bits", 1)
-			except ValueError:
-				return None, None
-			typename += 's'
-			if typename in typedefs:
-				return typename, suffix
-			else:
-				return None, None
+			return bits_to_flags.get(enumname, (None, None))
 		def process_constants(f):
-			for constant, value in constants.items():
-				constval, consttype = process_constant_value(value)
-				f.write(f'/// constant `{constant}` from {version}\n')
-				if not constant.startswith('StdVideo'):
-					f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{constant}.html>\n')
-				f.write(feature)
-				f.write(f'pub const {constant}: {consttype} = {constval};\n')
-			for constant, (value) in typed_constants.items():
-				constval, consttype = value
-				constval, infertype = process_constant_value(constval)
-				f.write(f'/// constant `{constant}` from {version}\n')
-				if not constant.startswith('StdVideo'):
-					f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{constant}.html>\n')
-				f.write(feature)
-				f.write(f'pub const {constant}: {consttype} = {constval};\n')
+			for constant in constants:
+				constval, consttype = rust_constant(*resolved_constants[constant])
+				f.write(f'/// constant `{constant}` from {version}\n{rust_reference(constant)}{feature}pub const {constant}: {consttype} = {constval};\n')
+			for constant in typed_constants:
+				value, type, literal = resolved_constants[constant]
+				f.write(f'/// constant `{constant}` from {version}\n{rust_reference(constant)}{feature}pub const {constant}: {type} = {rust_literal(value, True) if literal is None else rust_constant(value, type, literal)[0]};\n')
 		def process_typedefs(f):
-			for type, tname in typedefs.items():
-				tname = ctype_to_rust(tname)
+			for type, typedef in typedefs.items():
+				tname = ctype_to_rust(typedef.type)
 				if type not in must_alias:
-					f.write(f'/// type definition `{type}` from {version}\n')
-					if not type.startswith('StdVideo'):
-						f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{type}.html>\n')
-				else:
-					f.write(f'/// type definition for Rust: `{type}` = `{tname}`\n')
-					f.write(f'/// - Reference: <https://en.cppreference.com/w/cpp/types/integer.html>\n')
-				if is_good_identifier(type):
-					f.write(feature)
-					f.write('#[allow(non_camel_case_types)]\n')
-					f.write(f'pub type {type} = {tname};\n')
+					f.write(f'/// type definition `{type}` from {version}\n{rust_reference(type)}')
 				else:
+					f.write(f'/// type definition for Rust: `{type}` = `{tname}`\n/// - Reference: <https://en.cppreference.com/w/cpp/types/integer.html>\n')
+				if not is_good_identifier(type):
 					while type.endswith('*'):
 						type = type[:-1].rstrip()
 						if type.endswith('const'):
 							type = type[:-len('const')]
 					type = type.rsplit(' ', 1)[-1]
-					if is_good_identifier(type):
-						f.write(feature)
-						f.write('#[allow(non_camel_case_types)]\n')
-						f.write(f'pub type {type} = {tname};\n')
+				if is_good_identifier(type):
+					f.write(f'{feature}#[allow(non_camel_case_types)]\npub type {type} = {tname};\n')
 				enumbf_type, enumbf_data = is_bitfield_enum(type)
 				if enumbf_type is not None:
-					f.write(f'/// Convert `{type}` to `String`, showing the composition of the bits from the member of `{enumbf_type}`\n')
-					f.write(feature)
-					f.write(f'pub fn {to_snake(type)}_to_string(value: {type}) -> String {{\n')
-					f.write(f'\tlet mut flags = Vec::<&str>::with_capacity({len(enumbf_data)});\n')
-					for enum_string in enumbf_data:
-						f.write(f'\tif (value & {enumbf_type}::{enum_string} as {type}) == {enumbf_type}::{enum_string} as {type} {{\n')
-						f.write(f'\t\tflags.push("{enumbf_type}::{enum_string}");\n')
-						f.write('\t}\n')
-					f.write(f'\tlet ret = flags.join(" | ");\n')
-					f.write('\tif !ret.is_empty() {\n')
-					f.write('\t\tret\n')
-					f.write('\t} else {\n')
-					f.write('\t\tString::from("0")\n')
-					f.write('\t}\n')
-					f.write('}\n')
+					f.write(rust_flags_display(type, snake(type), enumbf_type, enumbf_data, feature))
 		def process_handles(f):
 			for handle in handles:
-				f.write(f'/// Normal handle `{handle}` from {version}\n')
-				if not handle.startswith('StdVideo'):
-					f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{handle}.html>\n')
-				f.write(f'{feature_inline}#[repr(C)] #[derive(Debug, Clone, Copy)] pub struct {handle}_T {{_unused: u32,}}\n')
-				f.write(f'{feature_inline}pub type {handle} = *const {handle}_T;\n')
+				f.write(f'/// Normal handle `{handle}` from {version}\n{rust_reference(handle)}'
+					f'{feature_inline}#[repr(C)] #[derive(Debug, Clone, Copy)] pub struct {handle}_T {{_unused: u32,}}\n'
+					f'{feature_inline}pub type {handle} = *const {handle}_T;\n')
 			for handle in non_dispatchable_handles:
 				f.write(f'/// Non-dispatchable handle `{handle}` from {version}\n')
 				if not handle.startswith('StdVideo'):
 					f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{handle}.html\n')
-				f.write(f'{feature_inline}#[cfg(target_pointer_width = "32")] pub type {handle} = u64;\n')
-				f.write(f'{feature_inline}#[cfg(target_pointer_width = "64")] #[repr(C)] #[derive(Debug, Clone, Copy)] pub struct {handle}_T {{_unused: u32,}}\n')
-				f.write(f'{feature_inline}#[cfg(target_pointer_width = "64")] pub type {handle} = *const {handle}_T;\n')
+				f.write(f'{feature_inline}#[cfg(target_pointer_width = "32")] pub type {handle} = u64;\n'
+					f'{feature_inline}#[cfg(target_pointer_width = "64")] #[repr(C)] #[derive(Debug, Clone, Copy)] pub struct {handle}_T {{_unused: u32,}}\n'
+					f'{feature_inline}#[cfg(target_pointer_width = "64")] pub type {handle} = *const {handle}_T;\n')
 		def process_enums(f):
-			for enum, enumpair in enums.items():
+			for enum, enum_item in enums.items():
 				already_values = {}
-				asso = io.StringIO()
-				f.write(f'/// enum `{enum}` from {version}\n')
-				if not enum.startswith('StdVideo'):
-					f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{enum}.html>\n')
-				f.write(feature)
-				f.write('#[repr(C)]\n')
-				f.write('#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, PartialOrd, Ord)]\n')
-				f.write('#[allow(non_camel_case_types)]\n')
-				f.write(f'pub enum {enum} {{\n')
-				for enumname, enumval in enumpair.items():
+				asso = Parts()
+				f.write(f'/// enum `{enum}` from {version}\n{rust_reference(enum)}{feature}#[repr(C)]\n'
+					'#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, PartialOrd, Ord)]\n'
+					f'#[allow(non_camel_case_types)]\npub enum {enum} {{\n')
+				for enumname, enumval in enum_item.values.items():
 					try:
-						enumdef, enumfrom = all_enum_values[enumval]
+						enumfrom = all_enum_values[enumval].name
 						asso.write(f'\tpub const {enumname}: {enumfrom} = {enumfrom}::{enumval};\n')
 					except KeyError:
-						enumval, valtype = process_constant_value(enumval)
+						enumval, enumtype, literal = resolved_constants[enumname]
+						if enumval is None:
+							enumval = literal
 						try:
 							enumalias = already_values[enumval]
 							asso.write(f'\tpub const {enumname}: {enum} = {enum}::{enumalias};\n')
 						except KeyError:
-							f.write(f'\t{enumname} = {enumval},\n')
-							already_values |= {enumval: enumname}
+							f.write(f'\t{enumname} = {rust_literal(enumval, "FlagBits" in enum) if literal is None else rust_constant(enumval, enumtype, literal)[0]},\n')
+							already_values[enumval] = enumname
 				f.write('}\n')
 				typename, suffix = is_the_enum_bitfield(enum)
 				if typename is not None:
-					f.write(f'impl BitAnd for {enum} {{\n')
-					f.write(f'\ttype Output = {typename};\n')
-					f.write(f'\tfn bitand(self, rhs: Self) -> {typename} {{\n')
-					f.write(f'\t\tself as {typename} & rhs as {typename}\n')
-					f.write('\t}\n')
-					f.write('}\n')
-					f.write(f'impl BitAnd<{typename}> for {enum} {{\n')
-					f.write(f'\ttype Output = {typename};\n')
-					f.write(f'\tfn bitand(self, rhs: {typename}) -> {typename} {{\n')
-					f.write(f'\t\tself as {typename} & rhs\n')
-					f.write('\t}\n')
-					f.write('}\n')
-					f.write(f'impl BitOr for {enum} {{\n')
-					f.write(f'\ttype Output = {typename};\n')
-					f.write(f'\tfn bitor(self, rhs: Self) -> {typename} {{\n')
-					f.write(f'\t\tself as {typename} | rhs as {typename}\n')
-					f.write('\t}\n')
-					f.write('}\n')
-					f.write(f'impl BitOr<{typename}> for {enum} {{\n')
-					f.write(f'\ttype Output = {typename};\n')
-					f.write(f'\tfn bitor(self, rhs: {typename}) -> {typename} {{\n')
-					f.write(f'\t\tself as {typename} | rhs\n')
-					f.write('\t}\n')
-					f.write('}\n')
-					f.write(f'impl BitXor for {enum} {{\n')
-					f.write(f'\ttype Output = {typename};\n')
-					f.write(f'\tfn bitxor(self, rhs: Self) -> {typename} {{\n')
-					f.write(f'\t\tself as {typename} ^ rhs as {typename}\n')
-					f.write('\t}\n')
-					f.write('}\n')
-					f.write(f'impl BitXor<{typename}> for {enum} {{\n')
-					f.write(f'\ttype Output = {typename};\n')
-					f.write(f'\tfn bitxor(self, rhs: {typename}) -> {typename} {{\n')
-					f.write(f'\t\tself as {typename} ^ rhs\n')
-					f.write('\t}\n')
-					f.write('}\n')
-					f.write(f'impl Not for {enum} {{\n')
-					f.write(f'\ttype Output = {typename};\n')
-					f.write(f'\tfn not(self) -> {typename} {{\n')
-					f.write(f'\t\t!(self as {typename})\n')
-					f.write('\t}\n')
-					f.write('}\n')
-					asso.write(f'\t/// Combine bits together\n')
-					asso.write(f'\tpub fn combine(bits: &[Self]) -> {typename} {{\n')
-					asso.write('\t\tlet mut ret = 0;\n')
-					asso.write('\t\tfor bit in bits {\n')
-					asso.write(f'\t\t\tret |= *bit as {typename};\n')
-					asso.write('\t\t}\n')
-					asso.write('\t\tret\n')
-					asso.write('\t}\n')
-					asso.write(f'\t/// Check if the bitfield has a value\n')
-					asso.write(f'\tpub fn check(value: {typename}, bits: Self) -> bool {{\n')
-					asso.write('\t\t(bits & value) == value\n')
-					asso.write('\t}\n')
-				asso = asso.getvalue()
-				if len(asso):
+					f.write(rust_bitflag_impls(enum, typename))
+					asso.write(rust_bitflag_methods(typename))
+				if asso:
 					f.write(f'impl {enum} {{\n')
-					f.write(asso)
+					f.extend(asso)
 					f.write('}\n')
 		def process_unions(f):
 			for union_name, union_guts in unions.items():
-				f.write(f'/// union `{union_name}` from {version}\n')
-				if not union_name.startswith('StdVideo'):
-					f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{union_name}.html>\n')
-				f.write(feature)
-				f.write('#[repr(C)]\n')
-				f.write('#[derive(Clone, Copy)]\n')
-				f.write(f'pub union {union_name} {{\n')
-				for name, type in union_guts.items():
+				members = Parts()
+				fields = Parts()
+				for name, type in union_guts.members():
+					fields.write(f'\t\t.field("{name.split("[", 1)[0]}", unsafe {{&self.{name.split("[", 1)[0]}}})\n')
 					name, type = process_guts(name, type)
-					f.write(f'\tpub {name}: {type},\n')
-				f.write('}\n')
-				f.write(feature)
-				f.write(f'impl Debug for {union_name} {{\n')
-				f.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
-				f.write(f'\t\tf.debug_struct("{union_name}")\n')
-				for name, type in union_guts.items():
-					name = name.split('[', 1)[0]
-					f.write(f'\t\t.field("{name}", unsafe {{&self.{name}}})\n')
-				f.write('\t\t.finish()\n')
-				f.write('\t}\n')
+					members.write(f'\tpub {name}: {type},\n')
+				f.write(f'/// union `{union_name}` from {version}\n{rust_reference(union_name)}{feature}#[repr(C)]\n#[derive(Clone, Copy)]\npub union {union_name} {{\n')
+				f.extend(members)
 				f.write('}\n')
+				f.write(rust_debug_impl(union_name, fields, feature))
 		def process_structs(f):
 			for struct_name, struct_guts in structs.items():
-				f.write(f'/// struct `{struct_name}` from {version}\n')
-				if not struct_name.startswith('StdVideo'):
-					f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{struct_name}.html>\n')
 				has_bitfield = False
 				num_bitfields = 0
 				last_bits = 0
-				struct = io.StringIO()
-				s_impl = io.StringIO()
-				d_impl = io.StringIO()
-				f.write(feature)
-				struct.write('#[repr(C)]\n')
-				if bool(struct_guts):
-					struct.write('#[derive(Clone, Copy)]\n')
-				else:
-					struct.write('#[derive(Debug, Clone, Copy)]\n')
-				struct.write(f'pub struct {struct_name} {{\n')
-				if bool(struct_guts):
-					d_impl.write(feature)
-					d_impl.write(f'impl Debug for {struct_name} {{\n')
-					d_impl.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
-					d_impl.write(f'\t\tf.debug_struct("{struct_name}")\n')
+				members = Parts()
+				s_impl = Parts()
+				fields = Parts()
 				have_special_fields = False
-				for name, type in struct_guts.items():
+				for name, type in struct_guts.members():
 					name, type = process_guts(name, type)
 					enumbf_type, enumbf_data = is_bitfield_enum(type)
 					if ':' in name:
 						if has_bitfield == False:
 							has_bitfield = True
 							num_bitfields = 1
-							s_impl.write(feature)
-							s_impl.write(f'impl {struct_name} {{\n')
+							s_impl.write(f'{feature}impl {struct_name} {{\n')
 						name, bits = name.split(':', 1)
 						bits = int(bits)
 						bf_name = f'bitfield{num_bitfields}'
-						struct.write(f'\t/// Bitfield: {name}: {type} in {bits} bits\n')
-						s_impl.write(f'\tpub fn get_{name}(&self) -> u32 {{\n')
-						if last_bits:
-							s_impl.write(f'\t\t(self.{bf_name} >> {last_bits}) & {hex((1 << bits) - 1)}\n')
-						else:
-							s_impl.write(f'\t\tself.{bf_name} & {hex((1 << bits) - 1)}\n')
-						s_impl.write('\t}\n')
-						s_impl.write(f'\tpub fn set_{name}(&mut self, value: u32) {{\n')
-						if last_bits:
-							s_impl.write(f'\t\tself.{bf_name} = (value & {hex((1 << bits) - 1)}) << {last_bits};\n')
-						else:
-							s_impl.write(f'\t\tself.{bf_name} = value & {hex((1 << bits) - 1)};\n')
-						s_impl.write('\t}\n')
+						members.write(f'\t/// Bitfield: {name}: {type} in {bits} bits\n')
+						s_impl.write(rust_bitfield_accessors(name, bf_name, bits, last_bits))
 						if enumbf_type is not None:
-							d_impl.write(f'\t\t.field("{name}", &format_args!("{{}}", {to_snake(type)}_to_string(self.get_{name}())))\n')
+							fields.write(f'\t\t.field("{name}", &{snake(type)}_display(self.get_{name}()))\n')
 							have_special_fields = True
 						else:
-							d_impl.write(f'\t\t.field("{name}", &self.get_{name}())\n')
+							fields.write(f'\t\t.field("{name}", &self.get_{name}())\n')
 						last_bits += bits
 						last_bits %= 32
 						if last_bits == 0:
-							struct.write(f'\t{bf_name}: u32,\n')
+							members.write(f'\t{bf_name}: u32,\n')
 							num_bitfields += 1
 					else:
 						if last_bits:
-							bf_name = f'bitfield{num_bitfields}'
-							struct.write(f'\tpub {bf_name}: u32,\n')
+							members.write(f'\tpub bitfield{num_bitfields}: u32,\n')
 							num_bitfields += 1
 							last_bits = 0
-						struct.write(f'\tpub {name}: {type},\n')
+						members.write(f'\tpub {name}: {type},\n')
 						if enumbf_type is not None:
-							d_impl.write(f'\t\t.field("{name}", &format_args!("{{}}", {to_snake(type)}_to_string(self.{name})))\n')
+							fields.write(f'\t\t.field("{name}", &{snake(type)}_display(self.{name}))\n')
 							have_special_fields = True
 						elif type.startswith('[i8; '):
-							d_impl.write(f'\t\t.field("{name}", &format_args!("{{}}", vk_format_maybe_string(&self.{name})))\n')
+							fields.write(f'\t\t.field("{name}", &VkMaybeStringDisplay(&self.{name}))\n')
 							have_special_fields = True
 						elif type.startswith('[u8; '):
-							d_impl.write(f'\t\t.field("{name}", &format_args!("{{}}", vk_to_byte_array_string(&self.{name})))\n')
+							fields.write(f'\t\t.field("{name}", &VkByteArrayDisplay(&self.{name}))\n')
 							have_special_fields = True
 						else:
-							d_impl.write(f'\t\t.field("{name}", &self.{name})\n')
+							fields.write(f'\t\t.field("{name}", &self.{name})\n')
 				if last_bits:
-					bf_name = f'bitfield{num_bitfields}'
-					struct.write(f'\tpub {bf_name}: u32,\n')
-				struct.write('}\n')
+					members.write(f'\tpub bitfield{num_bitfields}: u32,\n')
+				derive = 'Clone, Copy' if have_special_fields else 'Debug, Clone, Copy'
+				f.write(f'/// struct `{struct_name}` from {version}\n{rust_reference(struct_name)}{feature}#[repr(C)]\n#[derive({derive})]\npub struct {struct_name} {{\n')
+				f.extend(members)
+				f.write('}\n')
 				if has_bitfield:
-					s_impl.write('}\n')
-				if bool(struct_guts):
-					d_impl.write('\t\t.finish()\n')
-					d_impl.write('\t}\n')
-					d_impl.write('}\n')
+					f.extend(s_impl)
+					f.write('}\n')
 				if have_special_fields:
-					f.write(struct.getvalue())
-					f.write(s_impl.getvalue())
-					f.write(d_impl.getvalue())
-				else:
-					f.write(struct.getvalue().replace('#[derive(Clone, Copy)]', '#[derive(Debug, Clone, Copy)]'))
-					f.write(s_impl.getvalue())
+					f.write(rust_debug_impl(struct_name, fields, feature))
+		proto_params = {}
 		def proc_protos(f):
 			for functype_name, func_data in func_protos.items():
 				funcname = functype_name.split('PFN_', 1)[-1]
-				f.write(f'/// function prototype `{functype_name}` from {version}\n')
-				f.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{funcname}.html>\n')
-				f.write(feature)
-				f.write('#[allow(non_camel_case_types)]\n')
-				f.write(f'type {functype_name} = extern "system" fn(')
-				params = []
-				for param_name, param_type in func_data['params'].items():
-					param_name, param_type = process_guts(param_name, param_type, is_param = True)
-					params += [f'{param_name}: {param_type}']
-				f.write(', '.join(params))
-				ret_type = func_data["ret_type"]
-				if ret_type == 'void':
-					f.write(f');\n')
-				else:
-					f.write(f') -> {ctype_to_rust(ret_type)};\n')
-		process_constants(f)
-		process_typedefs(f)
-		process_handles(f)
-		process_enums(f)
-		process_unions(f)
-		process_structs(f)
-		proc_protos(f)
-		dummys = io.StringIO()
-		traits = io.StringIO()
-		struct = io.StringIO()
-		t_impl = io.StringIO()
-		d_impl = io.StringIO()
-		s_impl = io.StringIO()
-		g_impl = io.StringIO()
-		struct_version = to_camel(f'VULKAN_{version.split("_", 1)[-1]}'.lower(), True)
-		snake_version = to_snake(version)
+				params = tuple(process_guts(param_name, param_type, is_param = True) for param_name, param_type in func_data.params())
+				params_decl = ', '.join(f'{param_name}: {param_type}' for param_name, param_type in params)
+				proto_params[functype_name] = params, params_decl
+				ret_type = func_data.ret_type
+				ret_type = '' if ret_type == 'void' else f' -> {ctype_to_rust(ret_type)}'
+				f.write(f'/// function prototype `{functype_name}` from {version}\n'
+					f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{funcname}.html>\n'
+					f'{feature}#[allow(non_camel_case_types)]\n'
+					f'{crate_vis}type {functype_name} = extern "system" fn({params_decl}){ret_type};\n')
+		for process in (process_constants, process_typedefs, process_handles, process_enums, process_unions, process_structs, proc_protos):
+			with stage(process.__name__):
+				process(f)
+		if timer is not None:
+			begin = timer.begin()
+		dummys = Parts()
+		traits = Parts()
+		struct = Parts()
+		t_impl = Parts()
+		d_impl = Parts()
+		s_impl = Parts()
+		g_impl = Parts()
+		snake_version, struct_version = index.version_names[version]
 		traits.write(f'/// trait for `{version}`\n')
 		if not version.startswith('StdVideo'):
 			traits.write(f'/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{version}.html>\n')
-		traits.write(feature)
-		traits.write('#[allow(non_camel_case_types)]\n')
-		traits.write(f'pub trait {version}: Debug {{')
-		struct.write(f'/// struct for `{version}`\n')
-		struct.write(feature)
-		if len(funcs):
-			struct.write(f'#[derive(Clone, Copy)]\n')
+		traits.write(f'{feature}#[allow(non_camel_case_types)]\npub trait {version}: Debug {{')
+		if len(funcs) and lazy:
+			derive = '#[cfg_attr(not(feature = "lazy_load"), derive(Copy))]\n#[derive(Clone)]\n'
+		elif len(funcs):
+			derive = '#[derive(Clone, Copy)]\n'
 		else:
-			struct.write(f'#[derive(Default, Debug, Clone, Copy)]\n')
-		struct.write(f'pub struct {struct_version} {{')
-		t_impl.write(feature)
-		t_impl.write(f'impl {version} for {struct_version} {{')
-		if len(funcs):
-			d_impl.write(feature)
-			d_impl.write(f'impl Default for {struct_version} {{\n')
-			d_impl.write('\tfn default() -> Self {\n')
-		s_impl.write(feature)
-		s_impl.write(f'impl {struct_version} {{\n')
-		if len(funcs):
-			g_impl.write(feature)
-			g_impl.write(f'impl Debug for {struct_version} {{\n')
-			g_impl.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
-			g_impl.write(f'\t\tf.debug_struct("{struct_version}")\n')
-		vk_struct.write(f'\t/// Subset of {version}\n')
-		vk_struct.write(feature_indent)
-		vk_struct.write(f'\t{snake_version}: {struct_version},\n')
-		vk_g_impl.write(f'\t/// Get the subset of {version}\n')
-		vk_g_impl.write(feature_indent)
-		vk_g_impl.write(f'\tpub fn get_{snake_version}(&self) -> &{struct_version} {{\n')
-		vk_g_impl.write(f'\t\t&self.{snake_version}\n')
-		vk_g_impl.write('\t}\n')
-		vk_traits.write(feature)
-		vk_traits.write(f'impl {version} for VkCore {{')
-		vk_s_impl.write(feature_indent_3)
-		vk_s_impl.write(f'\t\t\t{snake_version}: {struct_version}::new(instance, &mut get_instance_proc_address),\n')
-		snakes = {}
+			derive = '#[derive(Default, Debug, Clone, Copy)]\n'
+		struct.write(f'/// struct for `{version}`\n{feature}{derive}pub struct {struct_version} {{')
+		t_impl.write(f'{feature}impl {version} for {struct_version} {{')
+		s_impl.write(f'{feature}impl {struct_version} {{\n')
+		vk_struct.write(f'\t/// Subset of {version}\n{feature_indent}\t{snake_version}: {struct_version},\n')
+		vk_g_impl.write(f'\t/// Get the subset of {version}\n{feature_indent}\tpub fn get_{snake_version}(&self) -> &{struct_version} {{\n\t\t&self.{snake_version}\n\t}}\n')
+		vk_traits.write(f'{feature}impl {version} for VkCore {{')
+		vk_s_impl.write(f'{feature_indent_3}\t\t\t{snake_version}: {struct_version}::new(instance, &mut get_instance_proc_address),\n')
 		if len(funcs):
 			traits.write('\n')
 			vk_traits.write('\n')
-			s_impl.write("\tpub fn new(instance: VkInstance, mut get_instance_proc_address: impl FnMut(VkInstance, &'static str) -> *const c_void) -> Self {\n")
-			s_impl.write('\t\tSelf {\n')
-			d_impl.write('\t\tSelf {\n')
 			t_impl.write('\n')
 			struct.write('\n')
+			d_impl.write(f'{feature}impl Default for {struct_version} {{\n\tfn default() -> Self {{\n\t\tSelf {{\n')
+			s_impl.write("\tpub fn new(instance: VkInstance, mut get_instance_proc_address: impl FnMut(VkInstance, &'static str) -> *const c_void) -> Self {\n\t\tSelf {\n")
+			if lazy:
+				struct.write(f'\t#[cfg(feature = "lazy_load")]\n\t{crate_vis}loader: VkProcLoader,\n')
+				s_impl.write('\t\t\t#[cfg(feature = "lazy_load")]\n\t\t\tloader: VkProcLoader::new(instance, &mut get_instance_proc_address),\n')
+				d_impl.write('\t\t\t#[cfg(feature = "lazy_load")]\n\t\t\tloader: VkProcLoader::default(),\n')
 		else:
-			s_impl.write("\tpub fn new(_instance: VkInstance, _get_instance_proc_address: impl FnMut(VkInstance, &'static str) -> *const c_void) -> Self {\n")
-			s_impl.write('\t\tSelf {')
+			s_impl.write("\tpub fn new(_instance: VkInstance, _get_instance_proc_address: impl FnMut(VkInstance, &'static str) -> *const c_void) -> Self {\n\t\tSelf {")
+		fields = Parts()
 		for func in funcs:
-			func_snake = to_snake(func)
-			snakes[func_snake] = func
+			func_snake = snake(func)
+			if lazy:
+				proc = f'vk_proc!(self, {func_snake}, c"{func}", dummy_{func})'
+				core_proc = f'vk_proc!(self.{snake_version}, {func_snake}, c"{func}", dummy_{func})'
+			else:
+				proc = f'self.{func_snake}'
+				core_proc = f'self.{snake_version}.{func_snake}'
 			func_data = func_protos[f'PFN_{func}']
-			params = []
-			params_dummy = []
-			param_call = []
-			param_proto = []
-			ret_type = func_data["ret_type"]
+			params, params_decl = proto_params[f'PFN_{func}']
+			params_dummy = ', '.join(f'_: {param_type}' for param_name, param_type in params)
+			param_call = ', '.join(param_name for param_name, param_type in params)
+			ret_type = func_data.ret_type
 			ret_type_rust = ctype_to_rust(ret_type)
-			for param_name, param_type in func_data['params'].items():
-				param_name, param_type = process_guts(param_name, param_type, is_param = True)
-				params += [f'{param_name}: {param_type}']
-				params_dummy += [f'_: {param_type}']
-				param_call += [param_name]
-				param_proto += [param_type]
-			dummys.write(f'/// The dummy function for `{func}` from `{version}`\n')
-			dummys.write(feature)
-			dummys.write(f'extern "system" fn dummy_{func}({", ".join(params_dummy)})')
-			traits.write(f'\t/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{func}.html>\n')
-			traits.write(f'\tfn {func}(&self, {", ".join(params)})')
-			t_impl.write('\t#[inline(always)]\n')
-			t_impl.write(f'\tfn {func}(&self, {", ".join(params)})')
-			vk_traits.write('\t#[inline(always)]\n')
-			vk_traits.write(f'\tfn {func}(&self, {", ".join(params)})')
-			d_impl.write(f'\t\t\t{func_snake}: dummy_{func},\n')
-			if ret_type == 'void':
-				r_rettype_suffix = ''
-				dummys.write(' {\n')
-				traits.write(' -> Result<()>;\n')
-				t_impl.write(' -> Result<()> {\n')
-				vk_traits.write(' -> Result<()> {\n')
-			elif ret_type == 'VkResult':
-				r_rettype_suffix = f' -> {ret_type_rust}'
-				dummys.write(f'{r_rettype_suffix} {{\n')
-				traits.write(f' -> Result<()>;\n')
-				t_impl.write(f' -> Result<()> {{\n')
-				vk_traits.write(f' -> Result<()> {{\n')
+			dummy_ret = '' if ret_type == 'void' else f' -> {ret_type_rust}'
+			result_type = '()' if ret_type in ('void', 'VkResult') else ret_type_rust
+			reference = f'\t/// - Reference: <https://registry.khronos.org/vulkan/specs/latest/man/html/{func}.html>\n'
+			dummys.write(f'/// The dummy function for `{func}` from `{version}`\n'
+				f'{feature}{crate_vis}extern "system" fn dummy_{func}({params_dummy}){dummy_ret} {{\n'
+				f'\tpanic_any(VkError::NullFunctionPointer("{func}"))\n'
+				'}\n')
+			traits.write(f'{reference}\tfn {func}(&self, {params_decl}) -> Result<{result_type}>;\n')
+			t_impl.write(f'\t#[inline(always)]\n\tfn {func}(&self, {params_decl}) -> Result<{result_type}> {{\n')
+			t_impl.write(rust_call(func, ret_type, proc, param_call))
+			vk_traits.write(f'\t#[inline(always)]\n\tfn {func}(&self, {params_decl}) -> Result<{result_type}> {{\n')
+			vk_traits.write(rust_call(func, ret_type, core_proc, param_call))
+			if lazy:
+				d_impl.write(f'\t\t\t{func_snake}: vk_proc_default!(dummy_{func}),\n')
+				s_impl.write(f'\t\t\t{func_snake}: vk_proc_new!(get_instance_proc_address, instance, "{func}", dummy_{func}),\n')
+				fields.write(f'\t\t.field("{func}", &vk_proc_debug!(self.{func_snake}, dummy_{func}))\n')
+				struct.write(f'\t{crate_vis}{func_snake}: VkProc<PFN_{func}>,\n')
 			else:
-				r_rettype_suffix = f' -> {ret_type_rust}'
-				dummys.write(f'{r_rettype_suffix} {{\n')
-				traits.write(f' -> Result<{ret_type_rust}>;\n')
-				t_impl.write(f' -> Result<{ret_type_rust}> {{\n')
-				vk_traits.write(f' -> Result<{ret_type_rust}> {{\n')
-			dummys.write(f'\tpanic_any(VkError::NullFunctionPointer("{func}"))\n')
-			dummys.write('}\n')
-			s_impl.write(f'\t\t\t{func_snake}: {{let proc = get_instance_proc_address(instance, "{func}"); if proc.is_null() {{dummy_{func}}} else {{unsafe {{transmute(proc)}}}}}},\n')
-			g_impl.write(f'\t\t.field("{func}", &if self.{func_snake} == dummy_{func} {{null::<c_void>()}} else {{self.{func_snake} as *const c_void}})\n')
-			if ret_type == 'void':
-				t_impl.write('\t\t#[cfg(feature = "catch_nullptr")]\n')
-				t_impl.write(f'\t\treturn vk_process_catch(catch_unwind(||((self.{func_snake})({", ".join(param_call)}))));\n')
-				t_impl.write('\t\t#[cfg(not(feature = "catch_nullptr"))]\n')
-				t_impl.write(f'\t\treturn {{(self.{func_snake})({", ".join(param_call)}); Ok(())}};\n')
-				vk_traits.write('\t\t#[cfg(feature = "catch_nullptr")]\n')
-				vk_traits.write(f'\t\treturn vk_process_catch(catch_unwind(||((self.{snake_version}.{func_snake})({", ".join(param_call)}))));\n')
-				vk_traits.write('\t\t#[cfg(not(feature = "catch_nullptr"))]\n')
-				vk_traits.write(f'\t\treturn {{(self.{snake_version}.{func_snake})({", ".join(param_call)}); Ok(())}};\n')
-			elif ret_type == 'VkResult':
-				t_impl.write('\t\t#[cfg(feature = "catch_nullptr")]\n')
-				t_impl.write(f'\t\treturn vk_convert_result("{func}", catch_unwind(||((self.{func_snake})({", ".join(param_call)}))));\n')
-				t_impl.write('\t\t#[cfg(not(feature = "catch_nullptr"))]\n')
-				t_impl.write(f'\t\treturn vk_result_conv("{func}", (self.{func_snake})({", ".join(param_call)}));\n')
-				vk_traits.write('\t\t#[cfg(feature = "catch_nullptr")]\n')
-				vk_traits.write(f'\t\treturn vk_convert_result("{func}", catch_unwind(||((self.{snake_version}.{func_snake})({", ".join(param_call)}))));\n')
-				vk_traits.write('\t\t#[cfg(not(feature = "catch_nullptr"))]\n')
-				vk_traits.write(f'\t\treturn vk_result_conv("{func}", (self.{snake_version}.{func_snake})({", ".join(param_call)}));\n')
-			else:
-				t_impl.write('\t\t#[cfg(feature = "catch_nullptr")]\n')
-				t_impl.write(f'\t\treturn vk_process_catch(catch_unwind(||((self.{func_snake})({", ".join(param_call)}))));\n')
-				t_impl.write('\t\t#[cfg(not(feature = "catch_nullptr"))]\n')
-				t_impl.write(f'\t\treturn Ok((self.{func_snake})({", ".join(param_call)}));\n')
-				vk_traits.write('\t\t#[cfg(feature = "catch_nullptr")]\n')
-				vk_traits.write(f'\t\treturn vk_process_catch(catch_unwind(||((self.{snake_version}.{func_snake})({", ".join(param_call)}))));\n')
-				vk_traits.write('\t\t#[cfg(not(feature = "catch_nullptr"))]\n')
-				vk_traits.write(f'\t\treturn Ok((self.{snake_version}.{func_snake})({", ".join(param_call)}));\n')
-			t_impl.write('\t}\n')
-			vk_traits.write('\t}\n')
-			struct.write(f'\t{func_snake}: PFN_{func},\n')
+				d_impl.write(f'\t\t\t{func_snake}: dummy_{func},\n')
+				s_impl.write(f'\t\t\t{func_snake}: {{let proc = get_instance_proc_address(instance, "{func}"); if proc.is_null() {{dummy_{func}}} else {{unsafe {{transmute(proc)}}}}}},\n')
+				fields.write(f'\t\t.field("{func}", &if self.{func_snake} == dummy_{func} {{null::<c_void>()}} else {{self.{func_snake} as *const c_void}})\n')
+				struct.write(f'\t{crate_vis}{func_snake}: PFN_{func},\n')
+			if next(iter(func_data.param_types), None) in device_handles:
+				dev_struct.write(f'{feature_indent}\t{func_snake}: PFN_{func},\n')
+				dev_s_impl.write(f'{feature_indent_3}\t\t\t{func_snake}: {{let proc = get_device_proc_address(device, "{func}"); if proc.is_null() {{dummy_{func}}} else {{unsafe {{transmute(proc)}}}}}},\n')
+				dev_impl.write(f'{reference}{feature_indent}\t#[inline(always)]\n\tpub fn {func}(&self, {params_decl}) -> Result<{result_type}> {{\n')
+				dev_impl.write(rust_call(func, ret_type, f'self.{func_snake}', param_call))
 		traits.write('}\n')
 		struct.write('}\n')
 		t_impl.write('}\n')
 		if len(funcs):
-			d_impl.write('\t\t}\n')
-			d_impl.write('\t}\n')
-			d_impl.write('}\n')
+			d_impl.write('\t\t}\n\t}\n}\n')
 			s_impl.write('\t\t}\n')
+			g_impl.write(rust_debug_impl(struct_version, fields, feature))
 		else:
 			s_impl.write('}\n')
-		s_impl.write('\t}\n')
-		s_impl.write('}\n')
-		if len(funcs):
-			g_impl.write('\t\t.finish()\n')
-			g_impl.write('\t}\n')
-			g_impl.write('}\n')
+		s_impl.write('\t}\n}\n')
 		vk_traits.write('}\n')
-		f.write(dummys.getvalue())
-		f.write(traits.getvalue())
-		f.write(struct.getvalue())
-		f.write(t_impl.getvalue())
-		f.write(d_impl.getvalue())
-		f.write(s_impl.getvalue())
-		f.write(g_impl.getvalue())
-	vkresult_enum = parsed['VK_VERSION_1_0']['enums']['VkResult']
-	with open(outfile, 'w') as f:
-		f.write('\n')
-		f.write('#![allow(dead_code)]\n')
-		f.write('#![allow(non_snake_case)]\n')
-		f.write('#![allow(non_upper_case_globals)]\n')
-		f.write('#![allow(unpredictable_function_pointer_comparisons)]\n')
-		f.write('#![allow(clippy::too_many_arguments)]\n')
-		f.write('#![allow(clippy::missing_transmute_annotations)]\n')
-		f.write('\n')
-		f.write('use std::{\n')
-		f.write('\tcollections::BTreeSet,\n')
-		f.write('\tffi::{c_void, CStr, CString},\n')
-		f.write('\tfmt::{self, Debug, Formatter},\n')
-		f.write('\tpanic::panic_any,\n')
-		f.write('\tmem::transmute,\n')
-		f.write('\tops::{BitAnd, BitOr, BitXor, Deref, Not},\n')
-		f.write('\tptr::{null, null_mut},\n')
-		f.write('\tsync::Arc,\n')
-		f.write('};\n')
-		f.write('#[cfg(feature = "catch_nullptr")]\n')
-		f.write('use std::panic::{catch_unwind, resume_unwind};\n')
+		for part in (dummys, traits, struct, t_impl, d_impl, s_impl, g_impl):
+			f.extend(part)
+		if timer is not None:
+			timer.end('process_funcs', begin)
+		return ''.join(f), ''.join(vk_struct), ''.join(vk_traits), ''.join(vk_s_impl), ''.join(vk_g_impl), ''.join(dev_struct), ''.join(dev_s_impl), ''.join(dev_impl)
+	process_version.type_caches = (ctype_to_rust, process_guts)
+	return process_version
+
+rust_emitter = None
+rust_parsed = None
+type_cache_stats = {}
+
+def init_rust_worker(parsed, index, modules, lazy):
+	global rust_emitter, rust_parsed
+	rust_emitter = rust_version_emitter(parsed, index, modules = modules, lazy = lazy)
+	rust_parsed = parsed
+
+def emit_rust_version_job(version):
+	return rust_emitter(version, rust_parsed[version])
+
+rust_item_pattern = re.compile(r'^(?:#\[cfg\(feature = "(\w+)"\)\]\n)?(?:#\[.*\]\n)*(?:#\[.*?\] )*(?:pub(?:\(crate\))? )?(?:const|type|struct|enum|union|trait|(?:extern "system" )?fn) (\w+)', re.M)
+rust_doc_pattern = re.compile(r'^\s*///.*\n', re.M)
+rust_path_pattern = re.compile(r'(?<![\w:.])[A-Za-z_]\w*')
+rust_std_imports = {
+	'BTreeSet': ('std::collections', ''),
+	'c_void': ('std::ffi', ''),
+	'CStr': ('std::ffi', ''),
+	'CString': ('std::ffi', ''),
+	'fmt': ('std', ''),
+	'Debug': ('std::fmt', ''),
+	'Display': ('std::fmt', ''),
+	'Formatter': ('std::fmt', ''),
+	'panic_any': ('std::panic', ''),
+	'transmute': ('std::mem', ''),
+	'BitAnd': ('std::ops', ''),
+	'BitOr': ('std::ops', ''),
+	'BitXor': ('std::ops', ''),
+	'Deref': ('std::ops', ''),
+	'Not': ('std::ops', ''),
+	'null': ('std::ptr', ''),
+	'null_mut': ('std::ptr', ''),
+	'Arc': ('std::sync', ''),
+	'catch_unwind': ('std::panic', 'catch_nullptr'),
+	'resume_unwind': ('std::panic', 'catch_nullptr'),
+}
+
+def rust_module_name(version, index):
+	module = index.version_names[version][0]
+	return f'{module}_h' if module == version else module
+
+def gate_rust_modules(parsed, index):
+	return {version: verdata if version == 'metadata' or version.startswith('VK_VERSION_') or 'feature' in verdata else verdata | {'feature': rust_module_name(version, index)} for version, verdata in parsed.items()}
+
+def rust_module_features(parsed, gated, index):
+	features = {}
+	for version, verdata in gated.items():
+		if version == 'metadata' or 'feature' not in verdata:
+			continue
+		deps = features.setdefault(verdata['feature'], set())
+		for dep in version_dependencies(verdata, index):
+			dep_feature = gated[dep].get('feature')
+			if dep_feature is not None and dep_feature != verdata['feature']:
+				deps.add(dep_feature)
+	platforms = {verdata['feature'] for version, verdata in parsed.items() if version != 'metadata' and 'feature' in verdata}
+	f = Parts()
+	f.write('# The cargo features of the modules in this directory, merge them into the `[features]` of your `Cargo.toml`\n')
+	f.write('[features]\n')
+	f.write('default = ["all_extensions"]\n')
+	f.write('all_extensions = [\n')
+	for feature in features:
+		if feature not in platforms:
+			f.write(f'\t"{feature}",\n')
+	f.write(']\n')
+	for feature, deps in features.items():
+		deps = ', '.join(f'"{dep}"' for dep in sorted(deps))
+		f.write(f'{feature} = [{deps}]\n')
+	return f.getvalue()
+
+def write_rust_modules(out_dir, root, modules, features):
+	owners = {name: (0, path, feature) for name, (path, feature) in rust_std_imports.items()}
+	for feature, name in rust_item_pattern.findall(root):
+		owners.setdefault(name, (1, 'super', feature))
+	module_items = []
+	for i, (module, feature, body) in enumerate(modules):
+		items = set()
+		for item_feature, name in rust_item_pattern.findall(body):
+			items.add(name)
+			owners.setdefault(name, (i + 2, f'super::{module}', feature or item_feature))
+		module_items += [items]
+	os.makedirs(out_dir, exist_ok = True)
+	with write_if_changed(os.path.join(out_dir, 'mod.rs')) as f:
+		f.write(root)
+	with write_if_changed(os.path.join(out_dir, 'features.toml')) as f:
+		f.write(features)
+	for (module, feature, body), items in zip(modules, module_items):
+		imports = {}
+		for name in set(rust_path_pattern.findall(rust_doc_pattern.sub('', body))) - items:
+			try:
+				imports.setdefault(owners[name], []).append(name)
+			except KeyError:
+				pass
+		uses = Parts()
+		for (order, path, feature), names in sorted(imports.items()):
+			if feature:
+				uses.write(f'#[cfg(feature = "{feature}")]\n')
+			if len(names) > 1:
+				uses.write(f'use {path}::{{{", ".join(sorted(names))}}};\n')
+			else:
+				uses.write(f'use {path}::{names[0]};\n')
+		uses.write(body)
+		with write_if_changed(os.path.join(out_dir, f'{module}.rs')) as f:
+			f.write(uses.getvalue())
+
+def to_rust(outfile, parsed, jobs = 1, timer = None, index = None, modules = False, lazy = False):
+	if index is None:
+		index = SymbolIndex(parsed)
+	if modules:
+		parsed, ungated = gate_rust_modules(parsed, index), parsed
+	vk_struct = Parts()
+	vk_traits = Parts()
+	vk_s_impl = Parts()
+	vk_g_impl = Parts()
+	vk_struct.write('/// The all-in-one struct for your Vulkan APIs\n')
+	vk_struct.write('#[derive(Default, Clone, Debug)]\n')
+	vk_struct.write('pub struct VkCore {\n')
+	vk_struct.write('\t/// The Vulkan instance\n')
+	vk_struct.write(f'\tinstance: Arc<VkInstanceWrap>,\n')
+	vk_struct.write('\t/// The Vulkan extension strings\n')
+	vk_struct.write(f'\textensions: BTreeSet<String>,\n')
+	vk_struct.write('\t/// The application info\n')
+	vk_struct.write(f'\tapp_info: VkApplicationInfo,\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.write('impl Default for VkApplicationInfo {\n')
+	vk_s_impl.write('\tfn default() -> Self {\n')
+	vk_s_impl.write('\t\tlet app_name = CString::new("<APPLICATION NAME>").unwrap();\n')
+	vk_s_impl.write('\t\tlet engine_name = CString::new("<ENGINE_NAME>").unwrap();\n')
+	vk_s_impl.write('\t\tSelf {\n')
+	vk_s_impl.write('\t\t\tsType: VkStructureType::VK_STRUCTURE_TYPE_APPLICATION_INFO,\n')
+	vk_s_impl.write('\t\t\tpNext: null(),\n')
+	vk_s_impl.write('\t\t\tpApplicationName: app_name.as_ptr(),\n')
+	vk_s_impl.write('\t\t\tapplicationVersion: vk_make_version(1, 0, 0),\n')
+	vk_s_impl.write('\t\t\tpEngineName: engine_name.as_ptr(),\n')
+	vk_s_impl.write('\t\t\tengineVersion: vk_make_version(1, 0, 0),\n')
+	api_version = max((version for version in parsed if version.startswith('VK_VERSION_')), key = lambda version: tuple(map(int, version.split('_')[2:])))
+	vk_s_impl.write(f'\t\t\tapiVersion: VK_API_VERSION_{api_version[len("VK_VERSION_"):]},\n')
+	vk_s_impl.write('\t\t}\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('}\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.write('#[derive(Default, Debug, Clone, Copy)]\n')
+	vk_s_impl.write('pub struct VkInstanceWrap(VkInstance);\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.write('unsafe impl Send for VkInstanceWrap {}\n')
+	vk_s_impl.write('unsafe impl Sync for VkInstanceWrap {}\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.write('impl Deref for VkInstanceWrap {\n')
+	vk_s_impl.write('\ttype Target = VkInstance;\n')
+	vk_s_impl.write('\tfn deref(&self) -> &Self::Target {\n')
+	vk_s_impl.write('\t\t&self.0\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('}\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.write('impl VkCore {\n')
+	vk_s_impl.write('\t/// Create the all-in-one struct for your Vulkan APIs by a `get_instance_proc_address()` function\n')
+	vk_s_impl.write('\t/// You have to provide the `VkApplicationInfo` struct to specify your application info\n')
+	vk_s_impl.write('\t/// You can use `vk_make_version()`/`vk_make_api_version()` from this crate\n')
+	vk_s_impl.write("\tpub fn new(app_info: VkApplicationInfo, mut get_instance_proc_address: impl FnMut(VkInstance, &'static str) -> *const c_void) -> Result<Self> {\n")
+	vk_s_impl.write('\t\tlet vkEnumerateInstanceExtensionProperties = get_instance_proc_address(null(), "vkEnumerateInstanceExtensionProperties");\n')
+	vk_s_impl.write('\t\tif vkEnumerateInstanceExtensionProperties.is_null() {\n')
+	vk_s_impl.write('\t\t\treturn Err(VkError::NullFunctionPointer("vkEnumerateInstanceExtensionProperties"));\n')
+	vk_s_impl.write('\t\t}\n')
+	vk_s_impl.write('\t\tlet vkEnumerateInstanceExtensionProperties: PFN_vkEnumerateInstanceExtensionProperties = unsafe{transmute(vkEnumerateInstanceExtensionProperties)};\n')
+	vk_s_impl.write('\t\tlet mut ext_count: u32 = 0;\n')
+	vk_s_impl.write('\t\tvk_result_conv("vkEnumerateInstanceExtensionProperties", vkEnumerateInstanceExtensionProperties(null(), &mut ext_count, null_mut()))?;\n')
+	vk_s_impl.write('\t\tlet mut extensions: Vec<VkExtensionProperties> = Vec::with_capacity(ext_count as usize);\n')
+	vk_s_impl.write('\t\tvk_result_conv("vkEnumerateInstanceExtensionProperties", vkEnumerateInstanceExtensionProperties(null(), &mut ext_count, extensions.as_mut_ptr()))?;\n')
+	vk_s_impl.write('\t\tunsafe {extensions.set_len(ext_count as usize)};\n')
+	vk_s_impl.write('\t\tlet ext_pointers: Vec<*const i8> = extensions.iter().map(|prop|prop.extensionName.as_ptr()).collect();\n')
+	vk_s_impl.write('\t\tlet extension_strings: Vec<String> = ext_pointers.iter().map(|p|unsafe {CStr::from_ptr(*p)}.to_string_lossy().to_string()).collect();\n')
+	vk_s_impl.write('\t\t#[allow(unused_mut)]\n')
+	vk_s_impl.write("\t\tlet mut layers: Vec<&'static str> = Vec::new();\n")
+	vk_s_impl.write('\t\t#[cfg(feature = "validation_layer")]\n')
+	vk_s_impl.write('\t\tlayers.push("VK_LAYER_KHRONOS_validation\\0");\n')
+	vk_s_impl.write('\t\t#[cfg(feature = "api_dump")]\n')
+	vk_s_impl.write('\t\tlayers.push("VK_LAYER_LUNARG_api_dump\\0");\n')
+	vk_s_impl.write('\t\tlet layer_ptrs: Vec<*const i8> = layers.iter().map(|l|l.as_ptr() as *const i8).collect();\n')
+	vk_s_impl.write('\t\tlet create_info = VkInstanceCreateInfo {\n')
+	vk_s_impl.write('\t\t\tsType: VkStructureType::VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO,\n')
+	vk_s_impl.write('\t\t\tpNext: null(),\n')
+	vk_s_impl.write('\t\t\tflags: 0,\n')
+	vk_s_impl.write('\t\t\tenabledLayerCount: layer_ptrs.len() as u32,\n')
+	vk_s_impl.write('\t\t\tpApplicationInfo: &app_info,\n')
+	vk_s_impl.write('\t\t\tppEnabledLayerNames: layer_ptrs.as_ptr(),\n')
+	vk_s_impl.write('\t\t\tenabledExtensionCount: ext_pointers.len() as u32,\n')
+	vk_s_impl.write('\t\t\tppEnabledExtensionNames: ext_pointers.as_ptr()\n')
+	vk_s_impl.write('\t\t};\n')
+	vk_s_impl.write('\t\tlet vkCreateInstance = get_instance_proc_address(null(), "vkCreateInstance");\n')
+	vk_s_impl.write('\t\tif vkCreateInstance.is_null() {\n')
+	vk_s_impl.write('\t\t\treturn Err(VkError::NullFunctionPointer("vkCreateInstance"))\n')
+	vk_s_impl.write('\t\t}\n')
+	vk_s_impl.write('\t\tlet vkCreateInstance: PFN_vkCreateInstance = unsafe{transmute(vkCreateInstance)};\n')
+	vk_s_impl.write('\t\tlet mut instance: VkInstance = null();\n')
+	vk_s_impl.write('\t\tvk_result_conv("vkCreateInstance", vkCreateInstance(&create_info, null(), &mut instance))?;\n')
+	vk_s_impl.write('\t\t\n')
+	vk_s_impl.write('\t\tOk(Self {\n')
+	vk_s_impl.write('\t\t\tinstance: Arc::new(VkInstanceWrap(instance)),\n')
+	vk_s_impl.write('\t\t\textensions: extension_strings.into_iter().collect(),\n')
+	vk_s_impl.write('\t\t\tapp_info,\n')
+	vkresult_enum = parsed['VK_VERSION_1_0']['enums']['VkResult'].values
+	rust_modules = []
+	f = Parts()
+	f.write('\n')
+	f.write('#![allow(dead_code)]\n')
+	f.write('#![allow(non_snake_case)]\n')
+	f.write('#![allow(non_upper_case_globals)]\n')
+	f.write('#![allow(unpredictable_function_pointer_comparisons)]\n')
+	f.write('#![allow(clippy::too_many_arguments)]\n')
+	f.write('#![allow(clippy::missing_transmute_annotations)]\n')
+	if modules:
+		f.write('#![allow(unused_imports)]\n')
+	f.write('\n')
+	f.write('use std::{\n')
+	f.write('\tcollections::BTreeSet,\n')
+	f.write('\tffi::{c_void, CStr, CString},\n')
+	f.write('\tfmt::{self, Debug, Display, Formatter},\n')
+	f.write('\tpanic::panic_any,\n')
+	f.write('\tmem::transmute,\n')
+	f.write('\tops::{BitAnd, BitOr, BitXor, Deref, Not},\n')
+	f.write('\tptr::{null, null_mut},\n')
+	f.write('\tsync::Arc,\n')
+	f.write('};\n')
+	f.write('#[cfg(feature = "catch_nullptr")]\n')
+	f.write('use std::panic::{catch_unwind, resume_unwind};\n')
+	f.write('\n')
+	f.write('/// Make a version value\n')
+	f.write('pub fn vk_make_version(major: u32, minor: u32, patch: u32) -> u32 {\n')
+	f.write('\t(major << 22) | (minor << 12) | patch\n')
+	f.write('}\n')
+	f.write('/// Make an API version value\n')
+	f.write('pub fn vk_make_api_version(variant: u32, major: u32, minor: u32, patch: u32) -> u32 {\n')
+	f.write('\t(variant << 29) | (major << 22) | (minor << 12) | patch\n')
+	f.write('}\n')
+	f.write('/// Make a video standard version value\n')
+	f.write('pub fn vk_make_video_std_version(major: u32, minor: u32, patch: u32) -> u32 {\n')
+	f.write('\t(major << 22) | (minor << 12) | patch\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// A flags value that shows the names of its bits when it is formatted, like `VkQueueFlagBits::VK_QUEUE_GRAPHICS_BIT | VkQueueFlagBits::VK_QUEUE_COMPUTE_BIT`, or `0`\n')
+	f.write('#[derive(Clone, Copy)]\n')
+	f.write('pub struct VkFlagsDisplay<T: \'static> {\n')
+	f.write('\tpub value: T,\n')
+	f.write('\tpub names: &\'static [(T, &\'static str)],\n')
+	f.write('}\n')
+	f.write('impl<T: Copy + BitAnd<Output = T> + PartialEq> Display for VkFlagsDisplay<T> {\n')
+	f.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
+	f.write('\t\tlet mut empty = true;\n')
+	f.write('\t\tfor &(bits, name) in self.names {\n')
+	f.write('\t\t\tif (self.value & bits) == bits {\n')
+	f.write('\t\t\t\tif !empty {\n')
+	f.write('\t\t\t\t\tf.write_str(" | ")?;\n')
+	f.write('\t\t\t\t}\n')
+	f.write('\t\t\t\tf.write_str(name)?;\n')
+	f.write('\t\t\t\tempty = false;\n')
+	f.write('\t\t\t}\n')
+	f.write('\t\t}\n')
+	f.write('\t\tif empty {\n')
+	f.write('\t\t\tf.write_str("0")?;\n')
+	f.write('\t\t}\n')
+	f.write('\t\tOk(())\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('impl<T: Copy + BitAnd<Output = T> + PartialEq> Debug for VkFlagsDisplay<T> {\n')
+	f.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
+	f.write('\t\tDisplay::fmt(self, f)\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// A byte array that shows its data like `[0x01, 0xAB]` when it is formatted, without allocating\n')
+	f.write('#[derive(Clone, Copy)]\n')
+	f.write('pub struct VkByteArrayDisplay<\'a>(pub &\'a [u8]);\n')
+	f.write('impl Display for VkByteArrayDisplay<\'_> {\n')
+	f.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
+	f.write('\t\tf.write_str("[")?;\n')
+	f.write('\t\tfor (i, b) in self.0.iter().enumerate() {\n')
+	f.write('\t\t\tif i > 0 {\n')
+	f.write('\t\t\t\tf.write_str(", ")?;\n')
+	f.write('\t\t\t}\n')
+	f.write('\t\t\twrite!(f, "0x{b:02X}")?;\n')
+	f.write('\t\t}\n')
+	f.write('\t\tf.write_str("]")\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('impl Debug for VkByteArrayDisplay<\'_> {\n')
+	f.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
+	f.write('\t\tDisplay::fmt(self, f)\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// A fixed-length `i8` array that shows as a quoted string if it is a null-terminated UTF-8 string, or as the hexadecimal sequences of the bytes otherwise, without allocating\n')
+	f.write('#[derive(Clone, Copy)]\n')
+	f.write('pub struct VkMaybeStringDisplay<\'a>(pub &\'a [i8]);\n')
+	f.write('impl Display for VkMaybeStringDisplay<\'_> {\n')
+	f.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
+	f.write('\t\tlet bytes: &[u8] = unsafe {transmute(self.0)};\n')
+	f.write('\t\tmatch CStr::from_bytes_until_nul(bytes).map(|s|s.to_str()) {\n')
+	f.write('\t\t\tOk(Ok(s)) => write!(f, "\\"{s}\\""),\n')
+	f.write('\t\t\t_ => Display::fmt(&VkByteArrayDisplay(bytes), f),\n')
+	f.write('\t\t}\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('impl Debug for VkMaybeStringDisplay<\'_> {\n')
+	f.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
+	f.write('\t\tDisplay::fmt(self, f)\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// Convert byte array to a string that represents the data of the array.\n')
+	f.write('pub fn vk_to_byte_array_string<const N: usize>(input: &[u8; N]) -> String {\n')
+	f.write('\tVkByteArrayDisplay(input).to_string()\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// Convert a fixed-length `i8` array to a Rust string if it is a UTF-8 string; otherwise, return the hexadecimal sequences of the byte array\n')
+	f.write('pub fn vk_format_maybe_string<const N: usize>(input: &[i8; N]) -> String {\n')
+	f.write('\tVkMaybeStringDisplay(input).to_string()\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// The `Result` type for the Vulkan APIs\n')
+	f.write('#[derive(Debug, Clone)]\n')
+	f.write('pub enum VkError {\n')
+	f.write('\tNullFunctionPointer(&\'static str),\n')
+	for vkresult, result_value in vkresult_enum.items():
+		if vkresult == 'VK_SUCCESS': continue
+		if result_value in vkresult_enum: continue
+		f.write(f'\t{index.camel(vkresult)}(&\'static str),\n')
+	f.write('\tUnknownError((VkResult, &\'static str)),\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// Our result type for all of the Vulkan function wrappers\n')
+	f.write('type Result<T> = std::result::Result<T, VkError>;\n')
+	f.write('\n')
+	f.write('/// Translate the returned `Result<T>` from `std::panic::catch_unwind()` to our `Result<T>`\n')
+	f.write('#[cfg(feature = "catch_nullptr")]\n')
+	f.write('#[inline(always)]\n')
+	f.write('pub fn vk_process_catch<T>(ret: std::thread::Result<T>) -> Result<T> {\n')
+	f.write('\tmatch ret {\n')
+	f.write('\t\tOk(ret) => Ok(ret),\n')
+	f.write('\t\tErr(e) => {\n')
+	f.write('\t\t\tif let Some(e) = e.downcast_ref::<VkError>() {\n')
+	f.write('\t\t\t\tErr(e.clone())\n')
+	f.write('\t\t\t} else {\n')
+	f.write('\t\t\t\tresume_unwind(e)\n')
+	f.write('\t\t\t}\n')
+	f.write('\t\t}\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// Convert a `VkResult` to our `Result<()>` \n')
+	f.write('#[inline(always)]\n')
+	f.write('pub fn vk_result_conv(function_name: &\'static str, result: VkResult) -> Result<()> {\n')
+	f.write('\tmatch result {\n')
+	f.write('\t\tVkResult::VK_SUCCESS => Ok(()),\n')
+	for vkresult, result_value in vkresult_enum.items():
+		if vkresult == 'VK_SUCCESS': continue
+		if result_value in vkresult_enum: continue
+		f.write(f'\t\tVkResult::{vkresult} => Err(VkError::{index.camel(vkresult)}(function_name)),\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('/// Convert a result returned from `std::panic::catch_unwind()` with `VkResult` to our `Result<()>` \n')
+	f.write('#[cfg(feature = "catch_nullptr")]\n')
+	f.write('#[inline(always)]\n')
+	f.write('pub fn vk_convert_result(function_name: &\'static str, result: std::thread::Result<VkResult>) -> Result<()> {\n')
+	f.write('\tif let Ok(result) = result {\n')
+	f.write('\t\tvk_result_conv(function_name, result)\n')
+	f.write('\t} else {\n')
+	f.write('\t\tErr(VkError::NullFunctionPointer(function_name))\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('\n')
+	f.write('impl From<VkError> for VkResult {\n')
+	f.write('\tfn from(val: VkError) -> Self {\n')
+	f.write('\t\tmatch val {\n')
+	for vkresult, result_value in vkresult_enum.items():
+		if vkresult == 'VK_SUCCESS': continue
+		if result_value in vkresult_enum: continue
+		f.write(f'\t\t\tVkError::{index.camel(vkresult)}(_) => VkResult::{vkresult},\n')
+	f.write('\t\t\t_ => panic!("No `VkResult` value to `{val:?}`"),\n')
+	f.write('\t\t}\n')
+	f.write('\t}\n')
+	f.write('}\n')
+	f.write('\n')
+	if lazy:
+		f.write('/// The storage of a function pointer, a `OnceLock` that is filled on the first call when the feature "lazy_load" is enabled\n')
+		f.write('#[cfg(not(feature = "lazy_load"))]\n')
+		f.write('type VkProc<T> = T;\n')
+		f.write('/// The storage of a function pointer, a `OnceLock` that is filled on the first call when the feature "lazy_load" is enabled\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('type VkProc<T> = std::sync::OnceLock<T>;\n')
 		f.write('\n')
-		f.write('/// Make a version value\n')
-		f.write('pub fn vk_make_version(major: u32, minor: u32, patch: u32) -> u32 {\n')
-		f.write('\t(major << 22) | (minor << 12) | patch\n')
-		f.write('}\n')
-		f.write('/// Make an API version value\n')
-		f.write('pub fn vk_make_api_version(variant: u32, major: u32, minor: u32, patch: u32) -> u32 {\n')
-		f.write('\t(variant << 29) | (major << 22) | (minor << 12) | patch\n')
-		f.write('}\n')
-		f.write('/// Make a video standard version value\n')
-		f.write('pub fn vk_make_video_std_version(major: u32, minor: u32, patch: u32) -> u32 {\n')
-		f.write('\t(major << 22) | (minor << 12) | patch\n')
+		f.write('/// Resolves the function pointers by `vkGetInstanceProcAddr()` on their first call when the feature "lazy_load" is enabled\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('#[derive(Default, Debug, Clone, Copy)]\n')
+		f.write('pub struct VkProcLoader {\n')
+		f.write('\tinstance: VkInstance,\n')
+		f.write('\tget_instance_proc_addr: Option<extern "system" fn(VkInstance, *const i8) -> *const c_void>,\n')
 		f.write('}\n')
 		f.write('\n')
-		f.write('/// Convert byte array to a string that represents the data of the array.\n')
-		f.write('pub fn vk_to_byte_array_string<const N: usize>(input: &[u8; N]) -> String {\n')
-		f.write('\tformat!("[{}]", input.iter().map(|b|format!("0x{b:02X}")).collect::<Vec<String>>().join(", "))\n')
-		f.write('}\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('unsafe impl Send for VkProcLoader {}\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('unsafe impl Sync for VkProcLoader {}\n')
 		f.write('\n')
-		f.write('/// Convert a fixed-length `i8` array to a Rust string if it is a UTF-8 string; otherwise, return the hexadecimal sequences of the byte array\n')
-		f.write('pub fn vk_format_maybe_string<const N: usize>(input: &[i8; N]) -> String {\n')
-		f.write('\tmatch unsafe{CStr::from_ptr(input.as_ptr())}.to_str() {\n')
-		f.write('\t\tOk(s) => format!("\\"{s}\\""),\n')
-		f.write('\t\tErr(_) => vk_to_byte_array_string::<N>(unsafe{transmute(input)}),\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('impl VkProcLoader {\n')
+		f.write('\t/// Get `vkGetInstanceProcAddr()` by your `get_instance_proc_address()` function\n')
+		f.write("\tpub fn new(instance: VkInstance, mut get_instance_proc_address: impl FnMut(VkInstance, &'static str) -> *const c_void) -> Self {\n")
+		f.write('\t\tlet proc = get_instance_proc_address(instance, "vkGetInstanceProcAddr");\n')
+		f.write('\t\tSelf {\n')
+		f.write('\t\t\tinstance,\n')
+		f.write('\t\t\tget_instance_proc_addr: if proc.is_null() {None} else {Some(unsafe {transmute(proc)})},\n')
+		f.write('\t\t}\n')
+		f.write('\t}\n')
+		f.write('\t/// Resolve a function pointer, return the dummy function if it is not available\n')
+		f.write('\t#[cold]\n')
+		f.write("\tpub fn load<T: Copy>(&self, name: &'static CStr, dummy: T) -> T {\n")
+		f.write('\t\tlet proc = match self.get_instance_proc_addr {\n')
+		f.write('\t\t\tSome(get_instance_proc_addr) => get_instance_proc_addr(self.instance, name.as_ptr() as *const i8),\n')
+		f.write('\t\t\tNone => null(),\n')
+		f.write('\t\t};\n')
+		f.write('\t\tif proc.is_null() {dummy} else {unsafe {std::mem::transmute_copy(&proc)}}\n')
 		f.write('\t}\n')
 		f.write('}\n')
 		f.write('\n')
-		f.write('/// The `Result` type for the Vulkan APIs\n')
-		f.write('#[derive(Debug, Clone)]\n')
-		f.write('pub enum VkError {\n')
-		f.write('\tNullFunctionPointer(&\'static str),\n')
-		for vkresult, result_value in vkresult_enum.items():
-			if vkresult == 'VK_SUCCESS': continue
-			if result_value in vkresult_enum: continue
-			f.write(f'\t{to_camel(vkresult, True)}(&\'static str),\n')
-		f.write('\tUnknownError((VkResult, &\'static str)),\n')
+		f.write('/// Get a function pointer, resolve it on the first call when the feature "lazy_load" is enabled\n')
+		f.write('#[cfg(not(feature = "lazy_load"))]\n')
+		f.write('macro_rules! vk_proc {\n')
+		f.write('\t($s:expr, $field:ident, $name:literal, $dummy:ident) => {$s.$field};\n')
 		f.write('}\n')
-		f.write('\n')
-		f.write('/// Our result type for all of the Vulkan function wrappers\n')
-		f.write('type Result<T> = std::result::Result<T, VkError>;\n')
-		f.write('\n')
-		f.write('/// Translate the returned `Result<T>` from `std::panic::catch_unwind()` to our `Result<T>`\n')
-		f.write('#[cfg(feature = "catch_nullptr")]\n')
-		f.write('#[inline(always)]\n')
-		f.write('pub fn vk_process_catch<T>(ret: std::thread::Result<T>) -> Result<T> {\n')
-		f.write('\tmatch ret {\n')
-		f.write('\t\tOk(ret) => Ok(ret),\n')
-		f.write('\t\tErr(e) => {\n')
-		f.write('\t\t\tif let Some(e) = e.downcast_ref::<VkError>() {\n')
-		f.write('\t\t\t\tErr(e.clone())\n')
-		f.write('\t\t\t} else {\n')
-		f.write('\t\t\t\tresume_unwind(e)\n')
-		f.write('\t\t\t}\n')
-		f.write('\t\t}\n')
-		f.write('\t}\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('macro_rules! vk_proc {\n')
+		f.write('\t($s:expr, $field:ident, $name:literal, $dummy:ident) => {*$s.$field.get_or_init(||$s.loader.load($name, $dummy))};\n')
 		f.write('}\n')
-		f.write('\n')
-		f.write('/// Convert a `VkResult` to our `Result<()>` \n')
-		f.write('#[inline(always)]\n')
-		f.write('pub fn vk_result_conv(function_name: &\'static str, result: VkResult) -> Result<()> {\n')
-		f.write('\tmatch result {\n')
-		f.write('\t\tVkResult::VK_SUCCESS => Ok(()),\n')
-		for vkresult, result_value in vkresult_enum.items():
-			if vkresult == 'VK_SUCCESS': continue
-			if result_value in vkresult_enum: continue
-			f.write(f'\t\tVkResult::{vkresult} => Err(VkError::{to_camel(vkresult, True)}(function_name)),\n')
-		f.write('\t}\n')
+		f.write('/// Initialize a function pointer, it is left empty until the first call when the feature "lazy_load" is enabled\n')
+		f.write('#[cfg(not(feature = "lazy_load"))]\n')
+		f.write('macro_rules! vk_proc_new {\n')
+		f.write('\t($get_instance_proc_address:ident, $instance:ident, $name:literal, $dummy:ident) => {{let proc = $get_instance_proc_address($instance, $name); if proc.is_null() {$dummy} else {unsafe {std::mem::transmute(proc)}}}};\n')
 		f.write('}\n')
-		f.write('\n')
-		f.write('/// Convert a result returned from `std::panic::catch_unwind()` with `VkResult` to our `Result<()>` \n')
-		f.write('#[cfg(feature = "catch_nullptr")]\n')
-		f.write('#[inline(always)]\n')
-		f.write('pub fn vk_convert_result(function_name: &\'static str, result: std::thread::Result<VkResult>) -> Result<()> {\n')
-		f.write('\tif let Ok(result) = result {\n')
-		f.write('\t\tvk_result_conv(function_name, result)\n')
-		f.write('\t} else {\n')
-		f.write('\t\tErr(VkError::NullFunctionPointer(function_name))\n')
-		f.write('\t}\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('macro_rules! vk_proc_new {\n')
+		f.write('\t($get_instance_proc_address:ident, $instance:ident, $name:literal, $dummy:ident) => {std::sync::OnceLock::new()};\n')
 		f.write('}\n')
-		f.write('\n')
-		f.write('impl From<VkError> for VkResult {\n')
-		f.write('\tfn from(val: VkError) -> Self {\n')
-		f.write('\t\tmatch val {\n')
-		for vkresult, result_value in vkresult_enum.items():
-			if vkresult == 'VK_SUCCESS': continue
-			if result_value in vkresult_enum: continue
-			f.write(f'\t\t\tVkError::{to_camel(vkresult, True)}(_) => VkResult::{vkresult},\n')
-		f.write('\t\t\t_ => panic!("No `VkResult` value to `{val:?}`"),\n')
-		f.write('\t\t}\n')
-		f.write('\t}\n')
+		f.write('/// The function pointer of a default instance: the dummy function, or an empty cell when the feature "lazy_load" is enabled\n')
+		f.write('#[cfg(not(feature = "lazy_load"))]\n')
+		f.write('macro_rules! vk_proc_default {\n')
+		f.write('\t($dummy:ident) => {$dummy};\n')
+		f.write('}\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('macro_rules! vk_proc_default {\n')
+		f.write('\t($dummy:ident) => {std::sync::OnceLock::new()};\n')
+		f.write('}\n')
+		f.write('/// The address of a function pointer for `Debug`, null if it is the dummy function or not resolved yet\n')
+		f.write('#[cfg(not(feature = "lazy_load"))]\n')
+		f.write('macro_rules! vk_proc_debug {\n')
+		f.write('\t($proc:expr, $dummy:ident) => {if $proc == $dummy {std::ptr::null::<std::ffi::c_void>()} else {$proc as *const std::ffi::c_void}};\n')
+		f.write('}\n')
+		f.write('#[cfg(feature = "lazy_load")]\n')
+		f.write('macro_rules! vk_proc_debug {\n')
+		f.write('\t($proc:expr, $dummy:ident) => {match $proc.get() {Some(proc) if *proc != $dummy => *proc as *const std::ffi::c_void, _ => std::ptr::null::<std::ffi::c_void>()}};\n')
 		f.write('}\n')
 		f.write('\n')
-		for version, verdata in parsed.items():
-			if version == 'metadata':
-				continue
-			process_version(version, verdata, f)
-		vk_struct.write('}\n')
-		vk_s_impl.write('\t\t})\n')
-		vk_s_impl.write('\t}\n')
-		vk_s_impl.write('\n')
-		vk_s_impl.write(vk_g_impl.getvalue())
-		vk_g_impl = None
-		vk_s_impl.write('\n')
-		vk_s_impl.write('\t/// Get `VkInstance`\n')
-		vk_s_impl.write('\tpub fn get_instance(&self) -> VkInstance {\n')
-		vk_s_impl.write('\t\t**self.instance\n')
-		vk_s_impl.write('\t}\n')
-		vk_s_impl.write('\t/// Get the application info\n')
-		vk_s_impl.write('\tpub fn get_app_info(&self) -> &VkApplicationInfo {\n')
-		vk_s_impl.write('\t\t&self.app_info\n')
-		vk_s_impl.write('\t}\n')
-		vk_s_impl.write('\t/// Get extensions\n')
-		vk_s_impl.write('\tpub fn get_extensions(&self) -> &BTreeSet<String> {\n')
-		vk_s_impl.write('\t\t&self.extensions\n')
-		vk_s_impl.write('\t}\n')
-		vk_s_impl.write('}\n')
-		vk_s_impl.write('\n')
-		vk_s_impl.write('impl Drop for VkCore {\n')
-		vk_s_impl.write('\tfn drop(&mut self) {\n')
-		vk_s_impl.write('\t\tself.vkDestroyInstance(self.get_instance(), null()).unwrap();\n')
-		vk_s_impl.write('\t}\n')
-		vk_s_impl.write('}\n')
-		vk_s_impl.write('\n')
-		vk_s_impl.write('unsafe impl Send for VkCore {}\n')
-		vk_s_impl.write('unsafe impl Sync for VkCore {}\n')
-		vk_s_impl.write('\n')
-		f.write(vk_struct.getvalue())
-		f.write(vk_traits.getvalue())
-		f.write(vk_s_impl.getvalue())
-		f.write('\n')
-		f.write('#[cfg(any(feature = "glfw", test))]\n')
+	versions = [version for version in parsed if version != 'metadata']
+	if jobs > 1:
+		with ProcessPoolExecutor(jobs, initializer = init_rust_worker, initargs = (parsed, index, modules, lazy)) as pool:
+			fragments = list(pool.map(emit_rust_version_job, versions, chunksize = max(1, len(versions) // (jobs * 4))))
+	else:
+		process_version = rust_version_emitter(parsed, index, timer, modules, lazy)
+		fragments = (process_version(version, parsed[version]) for version in versions)
+	dev_struct = Parts()
+	dev_s_impl = Parts()
+	dev_impl = Parts()
+	dev_struct.write('/// The device-level functions of a `VkDevice`, resolved by `vkGetDeviceProcAddr()` so that the calls skip the dispatch of the Vulkan loader\n')
+	dev_struct.write('#[derive(Clone, Copy)]\n')
+	dev_struct.write('pub struct VkDeviceDispatch {\n')
+	dev_struct.write('\t/// The Vulkan device\n')
+	dev_struct.write('\tdevice: VkDevice,\n')
+	for version, (body, struct, traits, s_impl, g_impl, dev_fields, dev_new, dev_funcs) in zip(versions, fragments):
+		if modules:
+			module = rust_module_name(version, index)
+			feature = f'#[cfg(feature = "{parsed[version]["feature"]}")]\n' if 'feature' in parsed[version] else ''
+			f.write(f'{feature}mod {module};\n')
+			f.write(f'{feature}pub use {module}::*;\n')
+			rust_modules += [(module, parsed[version].get('feature', ''), body)]
+		else:
+			f.write(body)
+		vk_struct.write(struct)
+		vk_traits.write(traits)
+		vk_s_impl.write(s_impl)
+		vk_g_impl.write(g_impl)
+		dev_struct.write(dev_fields)
+		dev_s_impl.write(dev_new)
+		dev_impl.write(dev_funcs)
+	if jobs <= 1:
+		for cache in process_version.type_caches:
+			hits, misses, maxsize, size = cache.cache_info()
+			type_cache_stats.setdefault(cache.__name__, Counter()).update(hits = hits, misses = misses)
+	vk_struct.write('}\n')
+	vk_s_impl.write('\t\t})\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.extend(vk_g_impl)
+	vk_g_impl = None
+	vk_s_impl.write('\n')
+	vk_s_impl.write('\t/// Get `VkInstance`\n')
+	vk_s_impl.write('\tpub fn get_instance(&self) -> VkInstance {\n')
+	vk_s_impl.write('\t\t**self.instance\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('\t/// Get the application info\n')
+	vk_s_impl.write('\tpub fn get_app_info(&self) -> &VkApplicationInfo {\n')
+	vk_s_impl.write('\t\t&self.app_info\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('\t/// Get extensions\n')
+	vk_s_impl.write('\tpub fn get_extensions(&self) -> &BTreeSet<String> {\n')
+	vk_s_impl.write('\t\t&self.extensions\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('}\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.write('impl Drop for VkCore {\n')
+	vk_s_impl.write('\tfn drop(&mut self) {\n')
+	vk_s_impl.write('\t\tself.vkDestroyInstance(self.get_instance(), null()).unwrap();\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('}\n')
+	vk_s_impl.write('\n')
+	vk_s_impl.write('unsafe impl Send for VkCore {}\n')
+	vk_s_impl.write('unsafe impl Sync for VkCore {}\n')
+	vk_s_impl.write('\n')
+	snake_version = index.version_names['VK_VERSION_1_0'][0]
+	if lazy:
+		get_device_proc_addr = f'vk_proc!(self.{snake_version}, vk_get_device_proc_addr, c"vkGetDeviceProcAddr", dummy_vkGetDeviceProcAddr)'
+	else:
+		get_device_proc_addr = f'self.{snake_version}.vk_get_device_proc_addr'
+	vk_s_impl.write('impl VkCore {\n')
+	vk_s_impl.write('\t/// Create the dispatch table of the device-level functions of `device` by `vkGetDeviceProcAddr()`\n')
+	vk_s_impl.write('\tpub fn get_device_dispatch(&self, device: VkDevice) -> Result<VkDeviceDispatch> {\n')
+	vk_s_impl.write(f'\t\tlet get_device_proc_addr = {get_device_proc_addr};\n')
+	vk_s_impl.write('\t\tif get_device_proc_addr == dummy_vkGetDeviceProcAddr {\n')
+	vk_s_impl.write('\t\t\treturn Err(VkError::NullFunctionPointer("vkGetDeviceProcAddr"));\n')
+	vk_s_impl.write('\t\t}\n')
+	vk_s_impl.write('\t\tlet get_device_proc_addr: extern "system" fn(VkDevice, *const i8) -> *const c_void = unsafe {transmute(get_device_proc_addr)};\n')
+	vk_s_impl.write('\t\tOk(VkDeviceDispatch::new(device, |device, name| {\n')
+	vk_s_impl.write('\t\t\tlet name = CString::new(name).unwrap();\n')
+	vk_s_impl.write('\t\t\tget_device_proc_addr(device, name.as_ptr())\n')
+	vk_s_impl.write('\t\t}))\n')
+	vk_s_impl.write('\t}\n')
+	vk_s_impl.write('}\n')
+	vk_s_impl.write('\n')
+	dev_struct.write('}\n')
+	dev_struct.write('\n')
+	dev_struct.write('impl VkDeviceDispatch {\n')
+	dev_struct.write('\t/// Resolve the device-level functions of `device` by a `get_device_proc_address()` function, e.g. a wrapper of `vkGetDeviceProcAddr()`\n')
+	dev_struct.write("\tpub fn new(device: VkDevice, mut get_device_proc_address: impl FnMut(VkDevice, &'static str) -> *const c_void) -> Self {\n")
+	dev_struct.write('\t\tSelf {\n')
+	dev_struct.write('\t\t\tdevice,\n')
+	dev_struct.extend(dev_s_impl)
+	dev_s_impl = None
+	dev_struct.write('\t\t}\n')
+	dev_struct.write('\t}\n')
+	dev_struct.write('\t/// Get `VkDevice`\n')
+	dev_struct.write('\tpub fn get_device(&self) -> VkDevice {\n')
+	dev_struct.write('\t\tself.device\n')
+	dev_struct.write('\t}\n')
+	dev_struct.extend(dev_impl)
+	dev_impl = None
+	dev_struct.write('}\n')
+	dev_struct.write('\n')
+	dev_struct.write('impl Debug for VkDeviceDispatch {\n')
+	dev_struct.write('\tfn fmt(&self, f: &mut Formatter) -> fmt::Result {\n')
+	dev_struct.write('\t\tf.debug_struct("VkDeviceDispatch").field("device", &self.device).finish_non_exhaustive()\n')
+	dev_struct.write('\t}\n')
+	dev_struct.write('}\n')
+	dev_struct.write('\n')
+	dev_struct.write('unsafe impl Send for VkDeviceDispatch {}\n')
+	dev_struct.write('unsafe impl Sync for VkDeviceDispatch {}\n')
+	dev_struct.write('\n')
+	if modules:
+		f.write('mod vk_core;\n')
+		f.write('pub use vk_core::*;\n')
+		rust_modules += [('vk_core', '', f'\n{vk_struct.getvalue()}{vk_traits.getvalue()}{vk_s_impl.getvalue()}')]
+		f.write('mod vk_device;\n')
+		f.write('pub use vk_device::*;\n')
+		rust_modules += [('vk_device', '', f'\n{dev_struct.getvalue()}')]
+	else:
+		f.extend(vk_struct)
+		f.extend(vk_traits)
+		f.extend(vk_s_impl)
+		f.extend(dev_struct)
+	f.write('\n')
+	surface = index.lookup('VkSurfaceKHR')
+	if surface is not None:
+		glfw_cfg = 'any(feature = "glfw", test)'
+		if 'feature' in parsed[surface.version]:
+			glfw_cfg = f'all({glfw_cfg}, feature = "{parsed[surface.version]["feature"]}")'
+		f.write(f'#[cfg({glfw_cfg})]\n')
 		f.write('mod glfw_create_surface {\n')
-		f.write('\tuse crate::*;\n')
+		f.write(f'\tuse {"super" if modules else "crate"}::*;\n')
 		f.write('\tuse glfw::*;\n')
 		f.write('\tuse glfw::ffi::*;\n')
 		f.write('\tunsafe extern "C" {\n')
@@ -1317,69 +2456,775 @@ def to_rust(outfile, parsed):
 		f.write('\t}\n')
 		f.write('}\n')
 		f.write('\n')
-		f.write('#[cfg(any(feature = "glfw", test))]\n')
+		f.write(f'#[cfg({glfw_cfg})]\n')
 		f.write('pub use glfw_create_surface::vkCreateWindowSurfaceGLFW;\n')
+	if modules:
+		write_rust_modules(outfile, f.getvalue(), rust_modules, rust_module_features(ungated, parsed, index))
+	else:
+		with write_if_changed(outfile) as output:
+			output.write(f.getvalue())
 
 
-if __name__ == '__main__':
-	basic_typedefs = {
-		'int8_t': 'i8',
-		'int16_t': 'i16',
-		'int32_t': 'i32',
-		'int64_t': 'i64',
-		'uint8_t': 'u8',
-		'uint16_t': 'u16',
-		'uint32_t': 'u32',
-		'uint64_t': 'u64',
-		'size_t': 'usize',
-		'char': 'i8',
-		'short': 'i16',
-		'int': 'i32',
-		'unsigned': 'u32',
-		'long': 'i64',
-		'float': 'f32',
-		'double': 'f64',
-	}
-	basic_aliases = basic_typedefs
-	wayland_typedefs = {
-		'struct wl_display*': '*const c_void',
-		'struct wl_surface*': '*const c_void',
+basic_typedefs = {
+	'int8_t': 'i8',
+	'int16_t': 'i16',
+	'int32_t': 'i32',
+	'int64_t': 'i64',
+	'uint8_t': 'u8',
+	'uint16_t': 'u16',
+	'uint32_t': 'u32',
+	'uint64_t': 'u64',
+	'size_t': 'usize',
+	'char': 'i8',
+	'short': 'i16',
+	'int': 'i32',
+	'unsigned': 'u32',
+	'long': 'i64',
+	'float': 'f32',
+	'double': 'f64',
+}
+basic_aliases = basic_typedefs
+wayland_typedefs = {
+	'struct wl_display*': '*const c_void',
+	'struct wl_surface*': '*const c_void',
+}
+wayland_aliases = {
+	'struct wl_display*': 'wl_display',
+	'struct wl_surface*': 'wl_surface',
+}
+win32_typedefs = {
+	'LPCWSTR': '*const i16',
+	'DWORD': 'u32',
+	'BOOL': 'u32',
+}
+win32_handles = [
+	'HINSTANCE',
+	'HANDLE',
+	'HWND',
+	'HMONITOR',
+]
+win32_structs = {
+	'SECURITY_ATTRIBUTES': {
+		'nLength': 'DWORD',
+		'lpSecurityDescriptor': 'const void*',
+		'bInheritHandle': 'BOOL',
 	}
-	wayland_aliases = {
-		'struct wl_display*': 'wl_display',
-		'struct wl_surface*': 'wl_surface',
-	}
-	win32_typedefs = {
-		'LPCWSTR': '*const i16',
-		'DWORD': 'u32',
-		'BOOL': 'u32',
-	}
-	win32_handles = [
-		'HINSTANCE',
-		'HANDLE',
-		'HWND',
-		'HMONITOR',
-	]
-	win32_structs = {
-		'SECURITY_ATTRIBUTES': {
-			'nLength': 'DWORD',
-			'lpSecurityDescriptor': 'const void*',
-			'bInheritHandle': 'BOOL',
+}
+xcb_typedefs = {
+	'xcb_connection_t*': '*const c_void',
+	'xcb_window_t': 'uint32_t',
+	'xcb_visualid_t': 'uint32_t',
+}
+platform_headers = [
+	('vulkan_android.h', {'feature_name': 'android_khr'}),
+	('vulkan_ios.h', {'feature_name': 'ios_mvk'}),
+	('vulkan_macos.h', {'feature_name': 'macos_mvk'}),
+	('vulkan_metal.h', {'feature_name': 'metal_ext'}),
+	('vulkan_wayland.h', {'typedefs': wayland_typedefs, 'aliases': wayland_aliases, 'feature_name': 'wayland_khr'}),
+	('vulkan_win32.h', {'handles': win32_handles, 'typedefs': win32_typedefs, 'structs': win32_structs, 'feature_name': 'win32_khr'}),
+	('vulkan_xcb.h', {'typedefs': xcb_typedefs, 'feature_name': 'xcb_khr'}),
+]
+
+def parse_vulkan_headers(jobs = 1, cache = None, timer = None):
+	start = time.perf_counter()
+	included = set()
+	with timer.stage('parse:vulkan_core.h') if timer is not None else nullcontext():
+		parsed = parse('vulkan_core.h', typedefs = basic_typedefs, aliases = basic_aliases, cache = cache, included = included)
+	timings = {'vulkan_core.h': time.perf_counter() - start}
+	base_key = None if cache is None else cache.last_key
+	parsed, platform_timings, platform_time = parse_headers(parsed, platform_headers, jobs, cache, timer, base_key, included)
+	timings |= platform_timings
+	with timer.stage('constants') if timer is not None else nullcontext():
+		parsed['metadata']['resolved_constants'] = evaluate_constants(parsed)
+	return parsed, timings, platform_time
+
+registry_sections = ('include', 'define', 'basetype', 'handle', 'constant', 'enum', 'bitmask', 'funcpointer', 'struct', 'command')
+registry_require_order = {'type': 0, 'enum': 1, 'command': 2}
+max_enum_word_pattern = re.compile(r'([0-9]+|[a-z_])([A-Z0-9])')
+max_enum_suffix_pattern = re.compile(r'[A-Z][A-Z]+$')
+
+def registry_text(elem):
+	parts = [elem.text or '']
+	for child in elem:
+		if child.tag != 'comment':
+			parts += [registry_text(child)]
+		parts += [child.tail or '']
+	return ''.join(parts)
+
+def registry_decl(elem):
+	text = bitfield_colon_pattern.sub(':', ' '.join(registry_text(elem).split()))
+	type, name = text.rsplit(' ', 1)
+	return name, type
+
+def is_vulkan_api(elem, attr = 'api'):
+	api = elem.get(attr)
+	return api is None or 'vulkan' in api.split(',')
+
+def max_enum_name(group_name):
+	name = max_enum_word_pattern.sub(r'\1_\2', group_name).upper()
+	m = max_enum_suffix_pattern.search(group_name)
+	if m is None:
+		return f'{name}_MAX_ENUM'
+	suffix = f'_{m.group()}'
+	return f'{name.rsplit(suffix, 1)[0]}_MAX_ENUM{suffix}'
+
+class Registry:
+	def __init__(self, input = 'vk.xml'):
+		self.input = input
+		self.types = {}
+		self.groups = {}
+		self.constants = {}
+		self.commands = {}
+		self.versions = []
+		self.generated = set()
+		self.included = set()
+		self.load()
+
+	def load(self):
+		parents = []
+		for event, elem in ElementTree.iterparse(self.input, ('start', 'end')):
+			if event == 'start':
+				parents += [elem]
+				continue
+			parents.pop()
+			depth = len(parents)
+			if depth == 1:
+				if elem.tag == 'enums':
+					self.load_enums(elem)
+				elif elem.tag == 'feature' and is_vulkan_api(elem):
+					self.versions += [(elem.get('name'), None, (0,), self.load_requires(elem, None))]
+			elif depth != 2 or parents[1].tag in ('enums', 'feature'):
+				continue
+			elif is_vulkan_api(elem):
+				if elem.tag == 'type':
+					self.load_type(elem)
+				elif elem.tag == 'command':
+					self.load_command(elem)
+				elif elem.tag == 'extension' and is_vulkan_api(elem, 'supported'):
+					self.load_extension(elem)
+			del parents[-1][-1]
+		core_versions = [version for version in self.versions if version[2] == (0,)]
+		extensions = sorted((version for version in self.versions if version[2] != (0,)), key = lambda version: version[2])
+		self.versions = core_versions + extensions
+
+	def load_type(self, elem):
+		name = elem.get('name') or elem.findtext('name')
+		if name in self.types:
+			return
+		category = elem.get('category')
+		record = {
+			'category': category,
+			'alias': elem.get('alias'),
+			'deps': [],
+			'enum_deps': [],
 		}
+		if record['alias'] is not None:
+			record['deps'] = [record['alias']]
+		elif category in ('struct', 'union'):
+			members = [member for member in elem.findall('member') if is_vulkan_api(member)]
+			record['members'] = dict(registry_decl(member) for member in members)
+			record['deps'] = [type.text for member in members for type in member.iter('type')]
+			record['enum_deps'] = [enum.text for member in members for enum in member.iter('enum')]
+		else:
+			record['text'] = registry_text(elem)
+			record['deps'] = [type.text for type in elem.findall('.//type')]
+		if elem.get('requires') is not None:
+			record['deps'] = [elem.get('requires')] + record['deps']
+		record['bitvalues'] = elem.get('bitvalues')
+		self.types[name] = record
+
+	def load_command(self, elem):
+		alias = elem.get('alias')
+		if alias is not None:
+			self.commands.setdefault(elem.get('name'), {'alias': alias})
+			return
+		proto = elem.find('proto')
+		name, ret_type = registry_decl(proto)
+		params = [param for param in elem.findall('param') if is_vulkan_api(param)]
+		self.commands.setdefault(name, {
+			'alias': None,
+			'ret_type': ret_type,
+			'params': dict(registry_decl(param) for param in params),
+			'deps': [type.text for node in [proto] + params for type in node.iter('type')],
+		})
+
+	def load_enums(self, elem):
+		if elem.get('type') == 'constants':
+			for enum in elem.findall('enum'):
+				value = enum.get('alias') or enum.get('value')
+				while f'{value[0]}{value[-1]}' == '()':
+					value = value[1:-1]
+				if value.isdigit():
+					value += {'uint32_t': 'U', 'uint64_t': 'ULL'}.get(enum.get('type'), '')
+				self.constants[enum.get('name')] = value
+			return
+		group = {
+			'type': elem.get('type'),
+			'bitwidth': int(elem.get('bitwidth', 32)),
+			'values': {},
+		}
+		self.groups[elem.get('name')] = group
+		for enum in elem.findall('enum'):
+			if is_vulkan_api(enum):
+				group['values'].setdefault(enum.get('name'), self.enum_value(enum, None))
+
+	def enum_value(self, elem, number):
+		alias = elem.get('alias')
+		if alias is not None:
+			return alias, True
+		bitpos = elem.get('bitpos')
+		if bitpos is not None:
+			return f'0x{1 << int(bitpos):08X}', False
+		offset = elem.get('offset')
+		if offset is not None:
+			value = 1000000000 + (int(elem.get('extnumber') or number) - 1) * 1000 + int(offset)
+			return str(-value if elem.get('dir') == '-' else value), False
+		return elem.get('value'), False
+
+	def load_requires(self, elem, number):
+		items = []
+		for require in elem.findall('require'):
+			if not is_vulkan_api(require):
+				continue
+			require_items = []
+			for item in require:
+				if item.tag not in ('type', 'enum', 'command') or not is_vulkan_api(item):
+					continue
+				name = item.get('name')
+				if item.tag == 'enum':
+					extends = item.get('extends')
+					if extends is not None:
+						if extends in self.groups:
+							self.groups[extends]['values'].setdefault(name, self.enum_value(item, number))
+						continue
+					value = item.get('value') or item.get('alias')
+					if value is not None:
+						self.constants.setdefault(name, value)
+				require_items += [(item.tag, name)]
+			items += sorted(require_items, key = lambda item: registry_require_order[item[0]])
+		return items
+
+	def load_extension(self, elem):
+		name = elem.get('name')
+		number = int(elem.get('number'))
+		items = self.load_requires(elem, number)
+		sort_key = (int(elem.get('sortorder', 0)), name.split('_', 2)[1] != 'KHR', number)
+		self.versions += [(name, elem.get('platform'), sort_key, items)]
+
+	def declarations(self, feature_name = None):
+		platform = None if feature_name is None else feature_name.rsplit('_', 1)[0]
+		base_dir = os.path.dirname(self.input)
+		first = True
+		for version, version_platform, sort_key, items in self.versions:
+			if version_platform != platform:
+				continue
+			sections = {section: [] for section in registry_sections}
+			for kind, name in items:
+				if kind == 'type':
+					self.require_type(version, name, sections)
+				elif kind == 'enum':
+					self.require_constant(version, name, sections)
+				else:
+					self.require_command(version, name, sections)
+			yield VersionStart(version, 0, first)
+			first = False
+			for section in registry_sections:
+				for decl in sections[section]:
+					if section == 'include':
+						yield from scan_declarations(os.path.join(base_dir, decl), 1, 1, self.included)
+					else:
+						yield decl
+
+	def require_constant(self, version, name, sections):
+		if name in self.generated or name not in self.constants:
+			return
+		self.generated.add(name)
+		value = self.constants[name]
+		self.require_constant(version, value, sections)
+		sections['constant'] += [ConstantDecl(version, name, value)]
+
+	def require_command(self, version, name, sections):
+		if name in self.generated or name not in self.commands:
+			return
+		self.generated.add(name)
+		command = self.commands[name]
+		if command['alias'] is not None:
+			self.require_command(version, command['alias'], sections)
+		while command['alias'] is not None:
+			command = self.commands[command['alias']]
+		for dep in command['deps']:
+			self.require_type(version, dep, sections)
+		sections['command'] += [FuncProtoDecl(version, f'PFN_{name}', command['ret_type'], dict(command['params']))]
+		sections['command'] += [CommandDecl(version, name)]
+
+	def require_type(self, version, name, sections):
+		if name in self.generated or name not in self.types:
+			return
+		self.generated.add(name)
+		record = self.types[name]
+		for dep in record['deps']:
+			self.require_type(version, dep, sections)
+		for dep in record['enum_deps']:
+			self.require_constant(version, dep, sections)
+		category = record['category']
+		alias = record['alias']
+		if alias is not None:
+			section = self.types[alias]['category']
+			if section == 'union':
+				section = 'struct'
+			if section == 'enum' and self.groups.get(alias, {}).get('type') == 'bitmask':
+				section = 'bitmask'
+			sections[section] += [TypedefDecl(version, name, alias)]
+		elif category == 'include':
+			text = record['text']
+			if '#include "' in text:
+				include_file = text.split('"', 2)[1]
+				if os.path.basename(include_file) != 'vk_platform.h':
+					sections['include'] += [include_file]
+		elif category == 'define':
+			self.require_define(version, name, record['text'], sections)
+		elif category == 'basetype':
+			text = record['text']
+			if '#else' in text:
+				text = text.split('#else', 1)[1].split('#endif', 1)[0]
+			line = ' '.join(text.split())
+			if line.startswith('struct ') or line.startswith('typedef struct ') and '*' in line:
+				sections['basetype'] += [HandleDecl(version, name, True)]
+			elif line.startswith('typedef '):
+				sections['basetype'] += [TypedefDecl(version, name, line[len('typedef '):-1].rsplit(' ', 1)[0])]
+		elif category == 'handle':
+			dispatchable = record['deps'][0] == 'VK_DEFINE_HANDLE'
+			sections['handle'] += [HandleDecl(version, name, dispatchable)]
+		elif category == 'enum':
+			self.require_group(version, name, sections)
+		elif category == 'bitmask':
+			type = 'VkFlags64' if 'VkFlags64' in record['deps'] else 'VkFlags'
+			sections['bitmask'] += [TypedefDecl(version, name, type)]
+			if record['bitvalues'] is not None:
+				self.require_type(version, record['bitvalues'], sections)
+		elif category == 'funcpointer':
+			text = ' '.join(record['text'].split())
+			params = {}
+			for param in text.split(f'{name})(', 1)[1].rsplit(')', 1)[0].split(','):
+				param = param.strip()
+				if param != 'void':
+					param_type, param_name = param.rsplit(' ', 1)
+					params[param_name] = param_type
+			sections['funcpointer'] += [FuncProtoDecl(version, name, text[len('typedef '):].split('(', 1)[0].strip(), params)]
+		elif category == 'struct':
+			sections['struct'] += [StructDecl(version, name, dict(record['members']))]
+		elif category == 'union':
+			sections['struct'] += [UnionDecl(version, name, dict(record['members']))]
+
+	def require_define(self, version, name, text, sections):
+		value = None
+		for line in strip_comments(text)[0].split('\n'):
+			parts = line.strip().split(None, 2)
+			if len(parts) == 3 and parts[0] == '#define' and parts[1] == name:
+				value = parts[2].strip()
+		if value is None or name == 'VK_USE_64_BIT_PTR_DEFINES':
+			return
+		value = define_value(value)
+		sections['define'] += [ConstantDecl(version, name, value)]
+
+	def require_group(self, version, name, sections):
+		group = self.groups.get(name)
+		if group is None:
+			return
+		values = {}
+		aliases = {}
+		for enum_name, (value, is_alias) in group['values'].items():
+			if is_alias:
+				aliases[enum_name] = value
+			else:
+				values[enum_name] = value
+		if group['bitwidth'] == 64:
+			sections['bitmask'] += [TypedefDecl(version, name, 'VkFlags64')]
+			for enum_name, (value, is_alias) in group['values'].items():
+				while is_alias:
+					value, is_alias = group['values'][value]
+				sections['bitmask'] += [TypedConstantDecl(version, enum_name, f'{value}ULL', name)]
+			return
+		section = 'bitmask' if group['type'] == 'bitmask' else 'enum'
+		sections[section] += [EnumDecl(version, name, values | aliases | {max_enum_name(name): '0x7FFFFFFF'})]
+
+def parse_registry(input = 'vk.xml', timer = None):
+	start = time.perf_counter()
+	with timer.stage(f'parse:{input}') if timer is not None else nullcontext():
+		registry = Registry(input)
+	with timer.stage('parse:versions') if timer is not None else nullcontext():
+		parsed = build_versions(registry.declarations(), typedefs = basic_typedefs, aliases = basic_aliases)
+		for header, kwargs in platform_headers:
+			parsed = build_versions(registry.declarations(kwargs['feature_name']), parsed, **kwargs)
+	with timer.stage('constants') if timer is not None else nullcontext():
+		parsed['metadata']['resolved_constants'] = evaluate_constants(parsed)
+	return parsed, {input: time.perf_counter() - start}
+
+output_counters = Counter()
+
+def file_digest(path):
+	h = hashlib.sha256()
+	try:
+		with open(path, 'rb') as f:
+			for chunk in iter(lambda: f.read(1024 * 1024), b''):
+				h.update(chunk)
+	except FileNotFoundError:
+		return None
+	return h.digest()
+
+@contextmanager
+def write_if_changed(path, mode = 'w', **kwargs):
+	temp_path = f'{path}.{os.getpid()}.tmp'
+	try:
+		with open(temp_path, mode, **kwargs) as f:
+			yield f
+		if os.path.exists(path) and os.path.getsize(path) == os.path.getsize(temp_path) and file_digest(path) == file_digest(temp_path):
+			os.remove(temp_path)
+			output_counters['unchanged'] += 1
+		else:
+			os.replace(temp_path, path)
+			output_counters['rewritten'] += 1
+	except BaseException:
+		try:
+			os.remove(temp_path)
+		except OSError:
+			pass
+		raise
+
+json_formats = ('indent', 'compact', 'sorted', 'stream')
+json_compressions = {
+	'none': ('', lambda f, mode: nullcontext(f)),
+	'gzip': ('.gz', lambda f, mode: gzip.GzipFile('', mode, fileobj = f, mtime = 0)),
+	'lzma': ('.xz', lzma.LZMAFile),
+}
+
+def json_default(value):
+	if isinstance(value, ModelItem):
+		return value.to_json()
+	return sorted(value)
+
+def json_dumps(obj, sort_keys = False):
+	if orjson is not None:
+		return orjson.dumps(obj, default = json_default, option = orjson.OPT_SORT_KEYS if sort_keys else 0)
+	return json.dumps(obj, separators = (',', ':'), sort_keys = sort_keys, default = json_default).encode()
+
+def metadata_to_json(metadata):
+	ret = {}
+	for key, value in metadata.items():
+		if key == 'all_enum_values':
+			ret[key] = {name: [enum.values[name], enum.name] for name, enum in value.items()}
+		elif key == 'resolved_constants':
+			ret[key] = {name: list(entry) for name, entry in value.items()}
+		elif isinstance(value, set):
+			ret[key] = sorted(value)
+		else:
+			ret[key] = dict(value)
+	return ret
+
+def metadata_to_model(metadata, enums):
+	intern = sys.intern
+	ret = {}
+	detached = {}
+	for key, value in metadata.items():
+		if key == 'all_enum_values':
+			ret[key] = {}
+			for name, (enum_value, enum_name) in value.items():
+				enum = enums.get(enum_name)
+				if enum is None or enum.values.get(name) != enum_value:
+					try:
+						enum = detached[enum_name]
+					except KeyError:
+						enum = detached[enum_name] = Enum(enum_name, {})
+					enum.values[intern(name)] = intern(enum_value)
+				ret[key][intern(name)] = enum
+		elif key == 'resolved_constants':
+			ret[key] = {intern(name): tuple(entry) for name, entry in value.items()}
+		elif isinstance(value, list):
+			ret[key] = set(map(intern, value))
+		else:
+			ret[key] = {intern(name): intern(text) for name, text in value.items()}
+	return ret
+
+def to_model(data):
+	ret = {}
+	enums = {}
+	for version, verdata in data.items():
+		if version == 'metadata':
+			ret[version] = None
+			continue
+		sections = ret[sys.intern(version)] = {}
+		for section, items in verdata.items():
+			try:
+				item_type = model_sections[section]
+			except KeyError:
+				sections[section] = list(map(sys.intern, items)) if isinstance(items, list) else items
+				continue
+			sections[section] = {item.name: item for item in (item_type.from_json(name, value) for name, value in items.items())}
+		enums |= sections.get('enums', {})
+	if 'metadata' in data:
+		ret['metadata'] = metadata_to_model(data['metadata'], enums)
+	return ret
+
+def from_model(parsed):
+	ret = {}
+	for version, verdata in parsed.items():
+		if version == 'metadata':
+			ret[version] = metadata_to_json(verdata)
+			continue
+		ret[version] = {section: {name: item.to_json() for name, item in items.items()} if isinstance(items, dict) else list(items) if isinstance(items, list) else items for section, items in verdata.items()}
+	return ret
+
+def json_document(parsed):
+	if 'metadata' not in parsed:
+		return parsed
+	return parsed | {'metadata': metadata_to_json(parsed['metadata'])}
+
+def dump_json(parsed, outfile = 'vkcore.json', format = 'indent', compression = 'none'):
+	suffix, opener = json_compressions[compression]
+	outfile += suffix
+	parsed = json_document(parsed)
+	with write_if_changed(outfile, 'wb') as raw, opener(raw, 'wb') as f:
+		if format == 'indent':
+			f.write(json.dumps(parsed, indent = 4, default = json_default).encode())
+		elif format == 'stream':
+			f.write(b'{')
+			for i, (key, value) in enumerate(parsed.items()):
+				f.write(b',\n' if i else b'\n')
+				f.write(json_dumps(key))
+				f.write(b':')
+				f.write(json_dumps(value))
+			f.write(b'\n}')
+		else:
+			f.write(json_dumps(parsed, format == 'sorted'))
+	return outfile
+
+def load_json(infile):
+	if os.path.isdir(infile):
+		return JsonShards(infile)
+	for suffix, opener in json_compressions.values():
+		if suffix and infile.endswith(suffix):
+			break
+	else:
+		opener = json_compressions['none'][1]
+	with open(infile, 'rb') as raw, opener(raw, 'rb') as f:
+		data = f.read()
+	if orjson is not None:
+		return orjson.loads(data)
+	return json.loads(data)
+
+def load_model(infile):
+	return to_model(load_json(infile))
+
+def dump_json_shards(parsed, shard_dir = 'vkcore.shards'):
+	os.makedirs(shard_dir, exist_ok = True)
+	entries = []
+	for version, verdata in parsed.items():
+		with write_if_changed(os.path.join(shard_dir, f'{version}.json'), 'wb') as f:
+			if version == 'metadata':
+				f.write(json_dumps(metadata_to_json(verdata)))
+				continue
+			f.write(b'{')
+			for i, (section, items) in enumerate(verdata.items()):
+				f.write(b',\n' if i else b'\n')
+				f.write(json_dumps(section))
+				f.write(b':')
+				if isinstance(items, dict):
+					f.write(b'{')
+					for j, (name, value) in enumerate(items.items()):
+						f.write(b',\n' if j else b'\n')
+						offset = f.tell()
+						entries += [(name, version, section, offset, None)]
+						if section == 'enums':
+							entries += [(enum_value, version, section, offset, name) for enum_value in value.values]
+						f.write(json_dumps(name))
+						f.write(b':')
+						f.write(json_dumps(value))
+					f.write(b'\n}')
+				elif isinstance(items, list):
+					f.write(b'[')
+					for j, name in enumerate(items):
+						f.write(b',\n' if j else b'\n')
+						entries += [(name, version, section, f.tell(), None)]
+						f.write(json_dumps(name))
+					f.write(b'\n]')
+				else:
+					f.write(json_dumps(items))
+			f.write(b'\n}')
+	entries.sort(key = lambda entry: entry[0].encode())
+	index_path = os.path.join(shard_dir, 'index')
+	with write_if_changed(index_path, 'w', newline = '\n') as f:
+		f.write('\t'.join(['#versions'] + list(parsed.keys())) + '\n')
+		for name, version, section, offset, enum in entries:
+			if enum is None:
+				f.write(f'{name}\t{version}\t{section}\t{offset}\n')
+			else:
+				f.write(f'{name}\t{version}\t{section}\t{offset}\t{enum}\n')
+	return index_path
+
+class JsonShards(Mapping):
+	def __init__(self, shard_dir = 'vkcore.shards'):
+		self.shard_dir = shard_dir
+		self.shards = {}
+		with open(os.path.join(shard_dir, 'index'), 'rb') as f:
+			self.index = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+		header = self.index[:self.index.find(b'\n')].decode()
+		self.versions = header.split('\t')[1:]
+
+	def __getitem__(self, version):
+		try:
+			return self.shards[version]
+		except KeyError:
+			pass
+		if version not in self.versions:
+			raise KeyError(version)
+		with open(os.path.join(self.shard_dir, f'{version}.json'), 'rb') as f:
+			data = f.read()
+		self.shards[version] = orjson.loads(data) if orjson is not None else json.loads(data)
+		return self.shards[version]
+
+	def __iter__(self):
+		return iter(self.versions)
+
+	def __len__(self):
+		return len(self.versions)
+
+	def find(self, symbol):
+		index = self.index
+		key = symbol.encode()
+		lo = 0
+		hi = len(index)
+		while lo < hi:
+			mid = (lo + hi) // 2
+			start = index.rfind(b'\n', 0, mid) + 1
+			end = index.find(b'\n', start)
+			if index[start:index.find(b'\t', start, end)] < key:
+				lo = end + 1
+			else:
+				hi = start
+		entries = []
+		while lo < len(index):
+			end = index.find(b'\n', lo)
+			name, version, section, offset, *enum = index[lo:end].decode().split('\t')
+			if name != symbol:
+				break
+			entries += [(version, section, int(offset), enum[0] if enum else None)]
+			lo = end + 1
+		return entries
+
+	def lookup(self, symbol):
+		ret = []
+		for version, section, offset, enum in self.find(symbol):
+			name = symbol if enum is None else enum
+			if version in self.shards:
+				items = self.shards[version][section]
+				value = items[name] if isinstance(items, dict) else name
+			else:
+				with open(os.path.join(self.shard_dir, f'{version}.json'), 'rb') as f:
+					f.seek(offset)
+					line = f.readline().rstrip(b',\n')
+				value = line[len(json_dumps(name)):]
+				value = json.loads(value[1:]) if value else name
+			ret += [(version, section, value if enum is None else value[symbol])]
+		return ret
+
+	def close(self):
+		self.index.close()
+
+def count_items(verdata):
+	return {
+		'constants': len(verdata['constants']) + len(verdata['typed_constants']),
+		'typedefs': len(verdata['typedefs']),
+		'handles': len(verdata['handles']) + len(verdata['non_dispatchable_handles']),
+		'enums': len(verdata['enums']),
+		'unions': len(verdata['unions']),
+		'structs': len(verdata['structs']),
+		'func_protos': len(verdata['func_protos']),
+		'funcs': len(verdata['funcs']),
 	}
-	xcb_typedefs = {
-		'xcb_connection_t*': '*const c_void',
-		'xcb_window_t': 'uint32_t',
-		'xcb_visualid_t': 'uint32_t',
-	}
-	parsed = parse('vulkan_core.h', typedefs = basic_typedefs, aliases = basic_aliases)
-	parsed = parse('vulkan_android.h', parsed, 1, feature_name = "android_khr")
-	parsed = parse('vulkan_ios.h', parsed, 1, feature_name = "ios_mvk")
-	parsed = parse('vulkan_macos.h', parsed, 1, feature_name = "macos_mvk")
-	parsed = parse('vulkan_metal.h', parsed, 1, feature_name = "metal_ext")
-	parsed = parse('vulkan_wayland.h', parsed, 1, typedefs = wayland_typedefs, aliases = wayland_aliases, feature_name = "wayland_khr")
-	parsed = parse('vulkan_win32.h', parsed, 1, handles = win32_handles, typedefs = win32_typedefs, structs = win32_structs, feature_name = "win32_khr")
-	parsed = parse('vulkan_xcb.h', parsed, 1, typedefs = xcb_typedefs, feature_name = "xcb_khr")
-	with open('vkcore.json', 'w') as f:
-		json.dump(parsed, f, indent=4)
-	to_rust('vkcore.rs', parsed)
+
+def count_all_items(parsed):
+	ret = Counter()
+	for version, verdata in parsed.items():
+		if version != 'metadata':
+			ret.update(count_items(verdata))
+	return ret
+
+if __name__ == '__main__':
+	start = time.perf_counter()
+	argp = argparse.ArgumentParser(description = 'Parse the Vulkan headers into `vkcore.json` and `vkcore.rs`')
+	argp.add_argument('--no-cache', action = 'store_true', help = 'Always parse the headers, ignoring the parse cache')
+	argp.add_argument('--cache-dir', default = '.vkparse_cache', help = 'The directory of the parse cache')
+	argp.add_argument('--cache-size', type = int, default = 64, help = 'The size limit of the parse cache in MiB')
+	argp.add_argument('--registry', action = 'store_true', help = 'Read `vk.xml` instead of scraping the headers')
+	argp.add_argument('--jobs', '-j', type = int, default = 1, help = 'The number of processes to parse the platform headers and to generate the Rust code')
+	argp.add_argument('--json-format', choices = json_formats, default = 'indent', help = 'The layout of `vkcore.json`: indented, compact, compact with sorted keys, or one version per line')
+	argp.add_argument('--json-compress', choices = list(json_compressions), default = 'none', help = 'Compress `vkcore.json` into `vkcore.json.gz` or `vkcore.json.xz`')
+	argp.add_argument('--json-shards', metavar = 'DIR', help = 'Also write one JSON file per version/extension and a symbol index into this directory')
+	argp.add_argument('--rust-modules', metavar = 'DIR', help = 'Write the Rust code as a module tree into this directory instead of `vkcore.rs`: `mod.rs`, one file per version/extension with every extension behind a cargo feature, and the feature table in `features.toml`')
+	argp.add_argument('--lazy-load', action = 'store_true', help = 'Generate the Rust code for the cargo feature `lazy_load`, which resolves every function pointer on its first call')
+	argp.add_argument('--include', action = 'append', default = [], metavar = 'PATTERN', help = 'Only generate the versions/extensions matching this pattern (like `VK_VERSION_1_*` or `VK_KHR_*`) and what they depend on, can be repeated')
+	argp.add_argument('--exclude', action = 'append', default = [], metavar = 'PATTERN', help = 'Do not generate the versions/extensions matching this pattern unless a selected one depends on them, can be repeated')
+	argp.add_argument('--commands', metavar = 'FILE', help = 'Only generate the commands listed in this file (one per line, `#` starts a comment) and the types, enums and constants they use')
+	argp.add_argument('--profile', action = 'store_true', help = 'Write the timings, allocations and parser counters to `vkcore.profile.json`')
+	argp.add_argument('--verbose', '-v', action = 'store_true', help = 'Print every diagnostic of the parser')
+	argp.add_argument('--log', action = 'append', default = [], choices = log_categories, help = 'Print the diagnostics of this category')
+	argp.add_argument('--mute', action = 'append', default = [], choices = log_categories, help = 'Never print the diagnostics of this category')
+	args = argp.parse_args()
+	log_handler = configure_logging(args.verbose, args.log, args.mute)
+	cache = None
+	if not args.no_cache and not args.profile:
+		cache = ParseCache(args.cache_dir, args.cache_size * 1024 * 1024)
+	timer = StageTimer() if args.profile else None
+	stage = timer.stage if timer is not None else lambda name: nullcontext()
+	if args.registry:
+		parsed, parse_timings = parse_registry('vk.xml', timer)
+	else:
+		parsed, parse_timings, platform_time = parse_vulkan_headers(args.jobs, cache, timer)
+	log_handler.flush()
+	for input, elapsed in parse_timings.items():
+		print(f'Parsed `{input}` in {elapsed * 1000:.1f} ms')
+	if not args.registry:
+		serial_time = sum(parse_timings.values()) - parse_timings['vulkan_core.h']
+		print(f'Parsed {len(platform_headers)} platform headers with {args.jobs} job(s) in {platform_time * 1000:.1f} ms, sum of the parse times is {serial_time * 1000:.1f} ms, speedup: {serial_time / platform_time:.2f}x')
+	if args.include or args.exclude:
+		total = len(parsed) - 1
+		with stage('select'):
+			parsed, required = select_versions(parsed, args.include, args.exclude)
+		print(f'Selected {len(parsed) - 1} of {total} versions/extensions')
+		if required:
+			print(f'Kept for the dependencies: {", ".join(required)}')
+	if args.commands:
+		with open(args.commands, 'r') as f:
+			commands = [line.split('#', 1)[0].strip() for line in f]
+		commands = [command for command in commands if command]
+		with stage('shake'):
+			index = SymbolIndex(parsed)
+			for command in commands:
+				symbol = index.lookup(command)
+				if symbol is None or symbol.kind != 'funcs':
+					print(f'Unknown command `{command}`')
+			before = count_all_items(parsed)
+			versions = len(parsed) - 1
+			parsed = shake_versions(parsed, commands, index)
+			after = count_all_items(parsed)
+		print(f'Kept {after.total()} of {before.total()} items ({after["funcs"]} commands, {after["structs"]} structs, {after["enums"]} enums) in {len(parsed) - 1} of {versions} versions/extensions for {len(commands)} listed commands')
+	with stage('json.dump'):
+		dump_json(parsed, 'vkcore.json', args.json_format, args.json_compress)
+	if args.json_shards:
+		with stage('json.shards'):
+			dump_json_shards(parsed, args.json_shards)
+	rust_output = args.rust_modules or 'vkcore.rs'
+	with stage('to_rust'):
+		to_rust(rust_output, parsed, 1 if args.profile else args.jobs, timer, modules = bool(args.rust_modules), lazy = args.lazy_load)
+	print(f'Rewrote {output_counters["rewritten"]} of {output_counters.total()} output files ({output_counters["unchanged"]} unchanged)')
+	if args.profile:
+		report = {
+			'wall_time': time.perf_counter() - start,
+			'jobs': args.jobs,
+			'stages': timer.report(),
+			'counters': dict(sorted((dict.fromkeys(('unknown_line', 'unknown_struct_data', 'skip_filtered_code'), 0) | parse_counters).items())),
+			'items': {version: count_items(verdata) for version, verdata in parsed.items() if version != 'metadata'},
+			'type_cache': {name: dict(stats, hit_rate = stats['hits'] / max(1, stats.total())) for name, stats in type_cache_stats.items()},
+		}
+		with open(os.path.join(os.path.dirname(os.path.normpath(rust_output)), 'vkcore.profile.json'), 'w') as f:
+			json.dump(report, f, indent=4)